@@ -1,14 +1,183 @@
 import sys, os
-from fastapi import FastAPI
+import csv, io, json, hashlib, logging, math, re, time
+from urllib.parse import quote
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.routing import Match
+
+try:
+    import orjson
+except ImportError:  # optional; responses fall back to the stdlib encoder
+    orjson = None
 
 # --- Add project root to path so imports work ---
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Import your db_manager
-from src import db as db
+# Import your db_manager (async variant, so requests wait on the event loop, not the threadpool)
+from src import async_db as db
+from src.admission import SHED, AdmissionController, admission_gauges, parse_route_limits
+from src.metrics import REQUEST_LATENCY, registry
+from src.resilience import BackendUnavailable
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed (datetimes and UUIDs natively)."""
+
+    def render(self, content):
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup hook: connect before the first request instead of during it. A failure is
+    # only logged; the client is built lazily and will be retried on first use.
+    try:
+        await db.warmup()
+    except Exception:
+        logging.getLogger("travel_diary").warning("Backend warmup failed", exc_info=True)
+    yield
+    # Shutdown: don't drop destination writes still waiting in the write-behind queue
+    await db.flush_writes()
 
-app = FastAPI(title="Travel Diary API")
+app = FastAPI(title="Travel Diary API", lifespan=lifespan, default_response_class=FastJSONResponse)
+
+MAX_PAGE_SIZE = 1000
+EXPORT_PAGE_SIZE = 500
+EXPORT_COLUMNS = ["destination_id", "destination_name", "country_name", "is_visited", "notes", "created_at"]
+EXPORT_FIELDS = ",".join(EXPORT_COLUMNS)
+
+# Per-user data may change at any time: caches must revalidate (cheap, thanks to the ETag)
+DESTINATIONS_CACHE_CONTROL = "private, no-cache"
+HOME_CACHE_CONTROL = "public, max-age=3600"
+HOME_MESSAGE = {"message": "Welcome to Travel Diary API"}
+HOME_ETAG = '"' + hashlib.sha256(json.dumps(HOME_MESSAGE).encode()).hexdigest()[:16] + '"'
+
+# -----------------------
+# Admission control
+# -----------------------
+# Registered before record_latency, which therefore wraps it and times shed requests too.
+# Off by default. Each route template gets ADMISSION_CONCURRENCY requests in flight (0 =
+# unlimited; set single routes with ADMISSION_ROUTE_LIMITS="/signin=16,/destinations/{user_name}/export=4").
+# Up to ADMISSION_QUEUE more wait at most ADMISSION_QUEUE_TIMEOUT seconds; the rest get a
+# 503. RATE_LIMIT_PER_CLIENT > 0 adds a token bucket per client address that answers 429
+# once RATE_LIMIT_BURST requests are used up. It is keyed on the caller, never on the user
+# named in the path: the API has no authentication, so anyone could spend another user's tokens.
+
+admission = AdmissionController(
+    concurrency=int(os.getenv("ADMISSION_CONCURRENCY", "0")),
+    max_queue=int(os.getenv("ADMISSION_QUEUE", "128")),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1.0")),
+    route_limits=parse_route_limits(os.getenv("ADMISSION_ROUTE_LIMITS", "")),
+    rate=float(os.getenv("RATE_LIMIT_PER_CLIENT", "0")),
+    burst=float(os.getenv("RATE_LIMIT_BURST", "20")),
+)
+admission_gauges(lambda: admission)
+ADMISSION_EXEMPT = {"/metrics"}
+OVERLOADED_RETRY_AFTER = 1
+
+def _match_route(scope):
+    """The route a request will be dispatched to, ahead of the router."""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+def _shed(route: str, reason: str, status_code: int, retry_after: float):
+    SHED.inc(route=route, reason=reason)
+    message = "Too many requests" if status_code == 429 else "Server is busy, please retry"
+    return FastJSONResponse({"Success": False, "Message": message}, status_code=status_code,
+                            headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+class AdmissionControl:
+    """A plain ASGI middleware rather than @app.middleware: the inner app only returns once
+    the last body chunk is sent, so a streamed export holds its slot until it is finished."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        route = _match_route(scope) if scope["type"] == "http" else None
+        if route is None or route.path in ADMISSION_EXEMPT:
+            return await self.app(scope, receive, send)
+        # Lets record_latency label requests shed here, before the router ever sees them
+        scope["route"] = route
+
+        client = scope.get("client")
+        wait = admission.rate_limit(client[0] if client else "")
+        if wait:
+            return await _shed(route.path, "rate_limited", 429, wait)(scope, receive, send)
+
+        limiter = admission.limiter(route.path)
+        if limiter is None:
+            return await self.app(scope, receive, send)
+        refused = await limiter.acquire()
+        if refused:
+            return await _shed(route.path, refused, 503, OVERLOADED_RETRY_AFTER)(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+app.add_middleware(AdmissionControl)
+
+# -----------------------
+# Metrics
+# -----------------------
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    # Labelled by route template (/destinations/{user_name}), not the raw path, to keep
+    # the series bounded. Streaming responses are timed until their headers are sent.
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status,
+        )
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text format: request latency per route, backend calls per table and operation
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.exception_handler(BackendUnavailable)
+async def backend_unavailable(request: Request, exc: BackendUnavailable):
+    # Backend timed out or the circuit is open (src/resilience.py): tell clients when to come back
+    return FastJSONResponse({"Success": False, "Message": "Service temporarily unavailable, please retry"},
+                            status_code=503, headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))})
+
+# -----------------------
+# Conditional GET
+# -----------------------
+
+def _etag_matches(request: Request, etag: str):
+    """If-None-Match uses weak comparison, so W/ prefixes are ignored."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+def _not_modified(etag: str, cache_control: str):
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+def _json(res, headers=None):
+    # Returning the response ourselves skips FastAPI's jsonable_encoder walk over every
+    # row; the db layer only hands back plain dicts, lists and scalars. Headers set on an
+    # injected Response are not merged into a returned one, so they are passed here.
+    return FastJSONResponse(res, headers=headers)
 
 # -----------------------
 # Models
@@ -30,18 +199,53 @@ class DestinationModel(BaseModel):
     is_visited: bool = False
     notes: str = None
 
+class BulkDestinationItem(BaseModel):
+    destination_name: str
+    country_name: str
+    is_visited: bool = False
+    notes: str = None
+
+class BulkAddModel(BaseModel):
+    user_name: str
+    destinations: List[BulkDestinationItem]
+
+class BulkUpdateItem(BaseModel):
+    destination_id: int
+    destination_name: str = None
+    country_name: str = None
+    is_visited: bool = None
+    notes: str = None
+
+class BulkUpdateModel(BaseModel):
+    destinations: List[BulkUpdateItem]
+
+class BulkDeleteModel(BaseModel):
+    destination_ids: List[int]
+
 # -----------------------
 # Auth Endpoints
 # -----------------------
 
 @app.post("/signup")
-def signup(user: SignUpModel):
-    res = db.insert_user(user.email, user.name, user.password)
+async def signup(user: SignUpModel):
+    res = await db.insert_user(user.email, user.name, user.password)
     return res
 
 @app.post("/signin")
-def signin(credentials: SignInModel):
-    res = db.authenticate_user(credentials.name, credentials.password)
+async def signin(credentials: SignInModel):
+    res = await db.authenticate_user(credentials.name, credentials.password)
+    return res
+
+@app.get("/users/{user_name}/stats")
+async def get_user_stats(user_name: str):
+    # Aggregated in the database; only the totals and per-country counts cross the wire
+    res = await db.get_destination_stats(user_name)
+    return res
+
+@app.post("/users/{user_name}/stats/check")
+async def check_user_stats(user_name: str, repair: bool = True):
+    # Consistency check for the incrementally maintained counters behind /stats
+    res = await db.check_destination_counters(user_name, repair)
     return res
 
 # -----------------------
@@ -49,8 +253,8 @@ def signin(credentials: SignInModel):
 # -----------------------
 
 @app.post("/destinations/add")
-def add_destination(destination: DestinationModel):
-    res = db.insert_destination(
+async def add_destination(destination: DestinationModel):
+    res = await db.insert_destination(
         destination.user_name,
         destination.destination_name,
         destination.country_name,
@@ -59,14 +263,121 @@ def add_destination(destination: DestinationModel):
     )
     return res
 
+# Bulk routes are registered before /destinations/{dest_id} so "bulk" is not parsed as an id.
+# Each runs as one batched backend write and returns one result per item.
+
+@app.post("/destinations/bulk")
+async def add_destinations_bulk(payload: BulkAddModel):
+    res = await db.insert_destinations(payload.user_name, [item.model_dump() for item in payload.destinations])
+    return _json(res)
+
+@app.put("/destinations/bulk")
+async def update_destinations_bulk(payload: BulkUpdateModel):
+    res = await db.update_destinations([item.model_dump() for item in payload.destinations])
+    return _json(res)
+
+@app.post("/destinations/bulk/delete")
+async def delete_destinations_bulk(payload: BulkDeleteModel):
+    res = await db.delete_destinations(payload.destination_ids)
+    return _json(res)
+
 @app.get("/destinations/{user_name}")
-def get_destinations_by_user(user_name: str):
-    res = db.get_destinations_by_user_name(user_name)
-    return res
+async def get_destinations_by_user(
+    request: Request,
+    user_name: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    fields: Optional[str] = None,
+):
+    # The stored version is read before the rows, so a write racing this request can only
+    # make the ETag stale (a later 200), never pin old rows under a new tag. Every process
+    # that writes moves it. It is None until the user_id is cached; that first response
+    # simply goes out without an ETag.
+    version = await db.get_data_version(user_name)
+    columns = db.destination_columns(fields)
+    headers = {"Cache-Control": DESTINATIONS_CACHE_CONTROL}
+    if version is not None and columns is not None:
+        # Built from the validated column list, never the raw query string
+        page = hashlib.sha256(f"{limit}-{after}-{columns}".encode()).hexdigest()[:16]
+        etag = f'"{version}-{page}"'
+        if _etag_matches(request, etag):
+            return _not_modified(etag, DESTINATIONS_CACHE_CONTROL)
+        headers["ETag"] = etag
+    # Keyset pagination: pass the previous page's NextCursor as `after`.
+    # `fields` (comma separated) narrows the columns returned; destination_id is always included.
+    res = await db.get_destinations_by_user_name(user_name, limit, after, fields)
+    return _json(res, headers)
+
+@app.get("/destinations/{user_name}/changes")
+async def get_destination_changes(user_name: str, since: int = Query(0, ge=0)):
+    # Delta sync: rows changed and ids deleted after `since`; send back Data.version next time
+    res = await db.get_destination_changes(user_name, since)
+    return _json(res)
+
+@app.get("/destinations/{user_name}/search")
+async def search_destinations(
+    user_name: str,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+):
+    # Ranked prefix/fuzzy matches over name, country and notes; each row carries its `score`
+    res = await db.search_destinations(user_name, q, limit)
+    return _json(res)
+
+# -----------------------
+# Export
+# -----------------------
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+def _format_row(row, fmt: str):
+    if fmt == "csv":
+        return _csv_line([row.get(column) for column in EXPORT_COLUMNS])
+    return json.dumps({column: row.get(column) for column in EXPORT_COLUMNS}, default=str) + "\n"
+
+def _attachment(filename: str):
+    """Content-Disposition for a download: an ASCII-safe filename= for old clients plus the
+    exact name as RFC 5987 filename*= (user names may hold quotes or non-latin-1 text)."""
+    fallback = re.sub(r'[^\x20-\x7e]|["\\]', "_", filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+async def _export_rows(user_name: str, first_page, fmt: str):
+    """Yield formatted rows page by page; the next page is only fetched once this one is sent.
+    A page that fails aborts the stream, so the client gets a broken transfer rather than a
+    short file that looks complete."""
+    if fmt == "csv":
+        yield _csv_line(EXPORT_COLUMNS)
+    page = first_page
+    while True:
+        if not _export_page_ok(page):
+            raise RuntimeError(f"Export of {user_name} failed: {page.get('Message')}")
+        for row in page.get("Data", []):
+            yield _format_row(row, fmt)
+        if not page.get("NextCursor"):
+            break
+        page = await db.get_destinations_by_user_name(user_name, EXPORT_PAGE_SIZE, page["NextCursor"], EXPORT_FIELDS)
+
+def _export_page_ok(page):
+    # An empty page is the end of the data, not an error
+    return page.get("Success") or page.get("Message") == "No destinations found"
+
+@app.get("/destinations/{user_name}/export")
+async def export_destinations(user_name: str, format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    # The first page is read up front so a failure (unknown user, lost writes) still gets the
+    # usual JSON error
+    first_page = await db.get_destinations_by_user_name(user_name, EXPORT_PAGE_SIZE, fields=EXPORT_FIELDS)
+    if not _export_page_ok(first_page):
+        return first_page
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": _attachment(f"{user_name}_destinations.{format}")}
+    return StreamingResponse(_export_rows(user_name, first_page, format), media_type=media_type, headers=headers)
 
 @app.put("/destinations/{dest_id}")
-def update_destination(dest_id: int, destination: DestinationModel):
-    res = db.update_destination_by_id(
+async def update_destination(dest_id: int, destination: DestinationModel):
+    res = await db.update_destination_by_id(
         dest_id,
         destination_name=destination.destination_name,
         country_name=destination.country_name,
@@ -76,8 +387,8 @@ def update_destination(dest_id: int, destination: DestinationModel):
     return res
 
 @app.delete("/destinations/{dest_id}")
-def delete_destination(dest_id: int):
-    res = db.delete_destination_by_id(dest_id)
+async def delete_destination(dest_id: int):
+    res = await db.delete_destination_by_id(dest_id)
     return res
 
 # -----------------------
@@ -85,5 +396,9 @@ def delete_destination(dest_id: int):
 # -----------------------
 
 @app.get("/")
-def home():
-    return {"message": "Welcome to Travel Diary API"}
\ No newline at end of file
+async def home(request: Request, response: Response):
+    if _etag_matches(request, HOME_ETAG):
+        return _not_modified(HOME_ETAG, HOME_CACHE_CONTROL)
+    response.headers["ETag"] = HOME_ETAG
+    response.headers["Cache-Control"] = HOME_CACHE_CONTROL
+    return HOME_MESSAGE
\ No newline at end of file
@@ -0,0 +1,147 @@
+# benchmarks/api_bench.py
+# End-to-end benchmark of the API/main.py endpoints (signup, signin, add, list, update,
+# delete) through the real Supabase backend code, with the network replaced by the
+# in-process fake in benchmarks/fake_supabase.py and a configurable latency per call
+# (plus optional injected failures and slow calls, see --failure-rate and --slow-rate).
+# Each endpoint runs as its own phase at the given concurrency; the report (JSON on
+# stdout or --output) has throughput and p50/p95/p99 latency per endpoint.
+#
+#   python benchmarks/api_bench.py --requests 1000 --concurrency 50 --latency 0.02 --output bench.json
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DB_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", ":memory:")
+
+import httpx
+
+from src import async_db
+from src.backends import SupabaseBackend
+from API.main import app
+from fake_supabase import AsyncFakeClient, FakeClient, FakeDatabase
+
+ENDPOINTS = ["signup", "signin", "add", "list", "update", "delete"]
+
+def install_fake_backend(latency: float, jitter: float, seed: int, **faults):
+    """Point both data layers at one FakeDatabase and return it. `faults` are passed to the
+    fake clients (failure_rate, slow_rate, slow_latency)."""
+    database = FakeDatabase()
+    async_db.set_backend(SupabaseBackend("fake", "fake", client=FakeClient(database, latency, jitter, seed, **faults),
+                                         async_client=AsyncFakeClient(database, latency, jitter, seed, **faults)))
+    return database
+
+def percentile(sorted_values, fraction: float):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies, errors: int, elapsed: float):
+    values = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed, 1) if elapsed else None,
+        "mean_ms": ms(sum(values) / len(values)) if values else None,
+        "p50_ms": ms(percentile(values, 0.50)),
+        "p95_ms": ms(percentile(values, 0.95)),
+        "p99_ms": ms(percentile(values, 0.99)),
+        "max_ms": ms(values[-1]) if values else None,
+    }
+
+def request_for(endpoint: str, i: int, users: int, destination_ids):
+    """(method, path, json body) of the i-th request of a phase."""
+    user = f"bench{i % users}"
+    if endpoint == "signup":
+        return "POST", "/signup", {"email": f"bench{i}@example.com", "name": f"bench{i}", "password": "secret"}
+    if endpoint == "signin":
+        return "POST", "/signin", {"name": user, "password": "secret"}
+    if endpoint == "add":
+        return "POST", "/destinations/add", {"user_name": user, "destination_name": f"Place {i}",
+                                             "country_name": "France", "is_visited": i % 2 == 0, "notes": "benchmark"}
+    if endpoint == "list":
+        return "GET", f"/destinations/{user}", None
+    destination_id = destination_ids[i % len(destination_ids)]
+    if endpoint == "update":
+        return "PUT", f"/destinations/{destination_id}", {"user_name": user, "destination_name": f"Place {i}",
+                                                          "country_name": "Italy", "is_visited": True, "notes": "updated"}
+    return "DELETE", f"/destinations/{destination_id}", None
+
+async def run_phase(client, endpoint: str, requests: int, concurrency: int, users: int, destination_ids):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors, created = [], 0, []
+
+    async def one(i):
+        nonlocal errors
+        method, path, body = request_for(endpoint, i, users, destination_ids)
+        async with semaphore:
+            started = time.perf_counter()
+            resp = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - started)
+        payload = resp.json() if resp.status_code == 200 else {}
+        if not payload.get("Success"):
+            errors += 1
+        elif endpoint == "add":
+            created.append(payload["Data"]["destination_id"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - started), created
+
+async def run(args):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)  # a 500 counts as an error
+    report = {}
+    destination_ids = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for endpoint in ENDPOINTS:
+            # Updates and deletes each touch every added destination once
+            requests = len(destination_ids) if endpoint in ("update", "delete") else args.requests
+            users = args.requests if endpoint == "signup" else min(args.users, args.requests)
+            if not requests:
+                continue
+            report[endpoint], created = await run_phase(client, endpoint, requests, args.concurrency, users, destination_ids)
+            destination_ids.extend(created)
+            print(f"{endpoint:>7}: {report[endpoint]['throughput_rps']:>9} req/s  "
+                  f"p50 {report[endpoint]['p50_ms']} ms  p95 {report[endpoint]['p95_ms']} ms  "
+                  f"p99 {report[endpoint]['p99_ms']} ms  errors {report[endpoint]['errors']}", file=sys.stderr)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-endpoint API throughput and latency against a fake Supabase")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per endpoint (signups create this many users)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100, help="users the signin/add/list requests cycle through")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated seconds per Supabase call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform random seconds per call")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the jitter and faults, for reproducible runs")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of Supabase calls that fail with a connection error")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of Supabase calls that take --slow-latency longer")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="extra seconds for a slow call")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    install_fake_backend(args.latency, args.jitter, args.seed, failure_rate=args.failure_rate,
+                         slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+    result = {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "endpoints": asyncio.run(run(args)),
+    }
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
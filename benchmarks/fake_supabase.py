@@ -0,0 +1,350 @@
+# benchmarks/fake_supabase.py
+# In-process stand-in for the supabase client, so SupabaseBackend/AsyncSupabaseBackend can
+# be driven without a network. It implements the slice of the PostgREST query builder that
+# src/backends.py uses (select with embedded resources and count(), insert, update, upsert,
+# delete, eq/gt/in_, order/limit incl. foreign_table, rpc search_destinations) on in-memory
+# tables that mimic the project schema: serial/uuid ids, defaults, versions and tombstones.
+# Faults can be injected per call: connection failures and occasional very slow answers.
+#
+#   client = FakeClient(FakeDatabase(), latency=0.05, jitter=0.01, failure_rate=0.1)
+#   backend = SupabaseBackend("fake", "fake", client=client)
+import asyncio
+import itertools
+import operator
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+# Primary key and indexed lookup columns per table
+PRIMARY_KEYS = {"users": "user_id", "destinations": "destination_id", "destination_tombstones": "destination_id"}
+INDEXED_COLUMNS = {"users": ["user_name", "user_email"], "destinations": ["user_id"], "destination_tombstones": ["user_id"]}
+UNIQUE_COLUMNS = {"users": ["user_email"]}
+
+class FakeAPIError(Exception):
+    """Raised where PostgREST would answer with an error, e.g. a unique violation."""
+
+class FakeTransportError(ConnectionError):
+    """Injected network failure, like a dropped connection to the REST API."""
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+def _split_columns(columns: str):
+    """Split a select string on top-level commas: "user_id, destinations(*)" -> two items."""
+    items, depth, current = [], 0, ""
+    for char in columns:
+        if char == "," and depth == 0:
+            items.append(current.strip())
+            current = ""
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current += char
+    if current.strip():
+        items.append(current.strip())
+    return items
+
+def _project(row, columns):
+    if "*" in columns:
+        return dict(row)
+    return {column: row.get(column) for column in columns}
+
+def _is_in(value, values):
+    return value in values
+
+def _compare(op, value, expected):
+    if value is None:
+        return False
+    return op(value, expected)
+
+class FakeDatabase:
+    """Tables shared by every FakeClient/AsyncFakeClient built on it. Thread safe."""
+
+    def __init__(self):
+        self.rows = {table: {} for table in PRIMARY_KEYS}
+        self.indexes = {(table, column): defaultdict(set) for table, columns in INDEXED_COLUMNS.items() for column in columns}
+        self._destination_ids = itertools.count(1)
+        self._versions = itertools.count(1)
+        self.lock = threading.Lock()
+
+    # ---- storage ----
+
+    def _index(self, table, row, add=True):
+        for column in INDEXED_COLUMNS.get(table, []):
+            bucket = self.indexes[(table, column)][row.get(column)]
+            pk = row[PRIMARY_KEYS[table]]
+            bucket.add(pk) if add else bucket.discard(pk)
+
+    def _store(self, table, row):
+        self.rows[table][row[PRIMARY_KEYS[table]]] = row
+        self._index(table, row)
+
+    def _remove(self, table, row):
+        del self.rows[table][row[PRIMARY_KEYS[table]]]
+        self._index(table, row, add=False)
+
+    def _with_defaults(self, table, row):
+        row = dict(row)
+        now = datetime.now(timezone.utc).isoformat()
+        if table == "users":
+            row.setdefault("user_id", str(uuid.uuid4()))
+            row.setdefault("signup_date", now)
+            for column in UNIQUE_COLUMNS["users"]:
+                if self.indexes[("users", column)].get(row.get(column)):
+                    raise FakeAPIError(f'duplicate key value violates unique constraint "users_{column}_key"')
+        elif table == "destinations":
+            row.setdefault("destination_id", next(self._destination_ids))
+            row.setdefault("created_at", now)
+            row.setdefault("is_visited", False)
+            row.setdefault("notes", None)
+            row.setdefault("country_key", None)
+            row["version"] = next(self._versions)
+        return row
+
+    def _candidates(self, table, filters):
+        """Rows of table matching the top-level filters, using the pk or an index when one is filtered on."""
+        rows = self.rows[table]
+        candidates = None
+        for column, op, value in filters:
+            if op is operator.eq and column == PRIMARY_KEYS[table]:
+                candidates = [rows[value]] if value in rows else []
+                break
+            if op is operator.eq and (table, column) in self.indexes:
+                candidates = [rows[pk] for pk in self.indexes[(table, column)].get(value, ())]
+                break
+        if candidates is None:
+            candidates = list(rows.values())
+        return [row for row in candidates if all(_compare(op, row.get(column), value) for column, op, value in filters)]
+
+    # ---- query execution ----
+
+    def run(self, query):
+        with self.lock:
+            return getattr(self, f"_run_{query.action}")(query)
+
+    def _top_filters(self, query):
+        return [(column, op, value) for column, op, value in query.filters if "." not in column]
+
+    def _sorted(self, rows, order, limit):
+        if order:
+            column, desc = order
+            rows = sorted(rows, key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        if limit is not None:
+            rows = rows[:limit]
+        return rows
+
+    def _run_select(self, query):
+        items = _split_columns(query.columns)
+        rows = self._candidates(query.table, self._top_filters(query))
+        if any(item.endswith("count()") for item in items):
+            return self._aggregate(rows, [item for item in items if not item.endswith("count()")])
+        plain = [item for item in items if "(" not in item]
+        embedded = [item for item in items if "(" in item]
+        result = []
+        for row in self._sorted(rows, query.orders.get(None), query.limits.get(None)):
+            out = _project(row, plain) if plain else {}
+            for item in embedded:
+                relation, inner = item[:-1].split("(", 1)
+                out[relation] = self._embedded(query, row, relation.strip(), _split_columns(inner))
+            result.append(out)
+        return result
+
+    def _embedded(self, query, parent, relation, columns):
+        # Every embedded resource in this schema hangs off users through user_id
+        filters = [(column.split(".", 1)[1], op, value) for column, op, value in query.filters
+                   if column.startswith(relation + ".")]
+        rows = self._candidates(relation, [("user_id", operator.eq, parent["user_id"])] + filters)
+        rows = self._sorted(rows, query.orders.get(relation), query.limits.get(relation))
+        return [_project(row, columns) for row in rows]
+
+    def _aggregate(self, rows, group_columns):
+        groups = defaultdict(int)
+        for row in rows:
+            groups[tuple(row.get(column) for column in group_columns)] += 1
+        return [dict(zip(group_columns, key), count=count) for key, count in groups.items()]
+
+    def _run_insert(self, query):
+        inserted = []
+        for row in query.payload:
+            row = self._with_defaults(query.table, row)
+            self._store(query.table, row)
+            inserted.append(dict(row))
+        return inserted
+
+    def _touch(self, table, row):
+        if table == "destinations":
+            row["version"] = next(self._versions)
+
+    def _run_update(self, query):
+        updated = []
+        for row in self._candidates(query.table, self._top_filters(query)):
+            self._index(query.table, row, add=False)
+            row.update(query.payload)
+            self._touch(query.table, row)
+            self._index(query.table, row)
+            updated.append(dict(row))
+        return updated
+
+    def _run_upsert(self, query):
+        key = query.on_conflict or PRIMARY_KEYS[query.table]
+        result = []
+        for row in query.payload:
+            existing = self.rows[query.table].get(row.get(key))
+            if existing is None:
+                existing = self._with_defaults(query.table, row)
+            else:
+                self._remove(query.table, existing)
+                existing = {**existing, **row}
+                self._touch(query.table, existing)
+            self._store(query.table, existing)
+            result.append(dict(existing))
+        return result
+
+    def _run_delete(self, query):
+        deleted = []
+        for row in self._candidates(query.table, self._top_filters(query)):
+            self._remove(query.table, row)
+            if query.table == "destinations":
+                tombstone = {"destination_id": row["destination_id"], "user_id": row["user_id"], "version": next(self._versions)}
+                existing = self.rows["destination_tombstones"].get(row["destination_id"])
+                if existing is not None:
+                    self._remove("destination_tombstones", existing)
+                self._store("destination_tombstones", tombstone)
+            deleted.append(dict(row))
+        return deleted
+
+    def _run_rpc(self, query):
+        if query.table != "search_destinations":
+            raise FakeAPIError(f"Could not find the function public.{query.table}")
+        params = query.payload
+        terms = params["p_query"].split()
+        scored = []
+        for row in self._candidates("destinations", [("user_id", operator.eq, params["p_user_id"])]):
+            text = " ".join(str(row.get(column) or "") for column in ("destination_name", "country_name", "notes")).lower()
+            hits = sum(term in text for term in terms)
+            if hits:
+                scored.append((-hits, row["destination_id"], row))
+        return [dict(row) for _, _, row in sorted(scored)[:params["p_limit"]]]
+
+class FakeQuery:
+    """Chainable query builder; nothing happens until execute()."""
+
+    def __init__(self, client, table: str, action="select", payload=None):
+        self.client = client
+        self.table = table
+        self.action = action
+        self.payload = payload
+        self.columns = "*"
+        self.filters = []
+        self.orders = {}
+        self.limits = {}
+        self.on_conflict = None
+
+    def select(self, columns: str = "*", **_):
+        self.action, self.columns = "select", columns
+        return self
+
+    def insert(self, rows, **_):
+        self.action, self.payload = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict=None, **_):
+        self.action, self.payload = "upsert", rows if isinstance(rows, list) else [rows]
+        self.on_conflict = on_conflict
+        return self
+
+    def update(self, values: dict, **_):
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self, **_):
+        self.action = "delete"
+        return self
+
+    def eq(self, column: str, value):
+        self.filters.append((column, operator.eq, value))
+        return self
+
+    def gt(self, column: str, value):
+        self.filters.append((column, operator.gt, value))
+        return self
+
+    def in_(self, column: str, values):
+        self.filters.append((column, _is_in, set(values)))
+        return self
+
+    def order(self, column: str, desc: bool = False, foreign_table=None, **_):
+        self.orders[foreign_table] = (column, desc)
+        return self
+
+    def limit(self, size: int, foreign_table=None, **_):
+        self.limits[foreign_table] = size
+        return self
+
+    def execute(self):
+        self.client._wait()
+        return FakeResponse(self.client.database.run(self))
+
+class AsyncFakeQuery(FakeQuery):
+    async def execute(self):
+        await self.client._wait()
+        return FakeResponse(self.client.database.run(self))
+
+class FakeClient:
+    """Sync stand-in for supabase.Client. Each execute() costs `latency` seconds plus up to
+    `jitter` more, like one round trip to the Supabase REST API. A `slow_rate` share of calls
+    take `slow_latency` seconds longer, and a `failure_rate` share raise FakeTransportError
+    after their round trip. All of these may be changed between calls, e.g. to stage an outage."""
+
+    query_class = FakeQuery
+
+    def __init__(self, database: FakeDatabase, latency: float = 0.0, jitter: float = 0.0, seed=None,
+                 failure_rate: float = 0.0, slow_rate: float = 0.0, slow_latency: float = 1.0):
+        self.database = database
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+
+    def _delay(self):
+        self.calls += 1
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if self.slow_rate and self.random.random() < self.slow_rate:
+            delay += self.slow_latency
+        return delay
+
+    def _fail(self):
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            self.failures += 1
+            raise FakeTransportError("injected connection failure")
+
+    def _wait(self):
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        self._fail()
+
+    def table(self, name: str):
+        return self.query_class(self, name)
+
+    def rpc(self, fn: str, params=None, **_):
+        return self.query_class(self, fn, action="rpc", payload=params or {})
+
+class AsyncFakeClient(FakeClient):
+    """Async stand-in for supabase.AsyncClient; the round trip is awaited."""
+
+    query_class = AsyncFakeQuery
+
+    async def _wait(self):
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        self._fail()
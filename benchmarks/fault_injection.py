@@ -0,0 +1,119 @@
+# benchmarks/fault_injection.py
+# Exercises the resilience layer (src/resilience.py, ResilientBackend in src/backends.py)
+# against the fake Supabase client with injected faults, through the async data layer:
+#
+#   slow-tail  a share of calls stall; compares list latency without and with hedging
+#   flaky      a share of calls fail; compares read errors without and with retries
+#   outage     every call fails for a while; shows the circuit opening, failing fast,
+#              and closing again once the backend is back
+#
+#   python benchmarks/fault_injection.py --scenario all
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DB_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", ":memory:")
+
+from src import async_db, db
+from src.resilience import BackendUnavailable, CircuitBreaker
+from api_bench import install_fake_backend, percentile
+
+USERS = 20
+
+def fake_client():
+    """The AsyncFakeClient under async_db.backend (resilient -> timed -> supabase)."""
+    return async_db.backend.backend.backend.client
+
+async def seed():
+    for u in range(USERS):
+        await async_db.insert_user(f"{u}@example.com", f"user{u}", "secret")
+        await async_db.insert_destinations(f"user{u}", [{"destination_name": f"Place {i}", "country_name": "France"}
+                                                        for i in range(5)])
+
+async def list_calls(requests: int, concurrency: int):
+    """(sorted latencies of successful calls, failed calls). Every request asks for a
+    different page size, so single-flight never merges them."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failed = [], 0
+
+    async def one(i):
+        nonlocal failed
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                res = await async_db.get_destinations_by_user_name(f"user{i % USERS}", limit=1 + i)
+                assert res["Success"], res
+                latencies.append(time.perf_counter() - started)
+            except BackendUnavailable:
+                failed += 1
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return sorted(latencies), failed
+
+def report(label: str, latencies, failed: int):
+    ms = lambda seconds: round(seconds * 1000, 1) if seconds is not None else None
+    print(f"{label:>28}: ok {len(latencies):>4}  failed {failed:>4}  p50 {ms(percentile(latencies, 0.5))} ms  "
+          f"p99 {ms(percentile(latencies, 0.99))} ms")
+
+async def slow_tail(args):
+    install_fake_backend(args.latency, 0, args.seed)
+    await seed()
+    client = fake_client()
+    client.slow_rate, client.slow_latency = 0.05, 1.0
+    for hedge_after in (None, 0.1):
+        db.resilience.hedge_after = hedge_after
+        report(f"5% stall 1s, hedge {hedge_after}", *await list_calls(args.requests, args.concurrency))
+    db.resilience.hedge_after = None
+
+async def flaky(args):
+    install_fake_backend(args.latency, 0, args.seed)
+    await seed()
+    fake_client().failure_rate = 0.2
+    db.resilience.breaker = CircuitBreaker(failure_threshold=0)  # isolate retries from the circuit
+    for retries in (0, 2):
+        db.resilience.retries = retries
+        report(f"20% failures, {retries} retries", *await list_calls(args.requests, args.concurrency))
+
+async def outage(args):
+    install_fake_backend(args.latency, 0, args.seed)
+    await seed()
+    client = fake_client()
+    db.resilience.breaker = CircuitBreaker(failure_threshold=5, reset_timeout=1.0)
+    client.failure_rate = 1.0
+    calls_before = client.calls
+    report("backend down", *await list_calls(args.requests, args.concurrency))
+    print(f"{'':>28}  {client.calls - calls_before} of {args.requests} requests reached the backend, "
+          f"circuit {db.resilience.breaker.state}")
+    client.failure_rate = 0.0
+    started = time.perf_counter()
+    while True:
+        latencies, failed = await list_calls(args.concurrency, args.concurrency)
+        if not failed:
+            break
+        await asyncio.sleep(0.1)
+    print(f"{'':>28}  recovered {time.perf_counter() - started:.1f}s after the backend came back, "
+          f"circuit {db.resilience.breaker.state}")
+
+SCENARIOS = {"slow-tail": slow_tail, "flaky": flaky, "outage": outage}
+
+def main():
+    parser = argparse.ArgumentParser(description="Timeouts, retries, hedging and the circuit breaker under injected faults")
+    parser.add_argument("--scenario", choices=list(SCENARIOS) + ["all"], default="all")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated seconds per Supabase call")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name, scenario in SCENARIOS.items():
+        if args.scenario in (name, "all"):
+            print(f"-- {name}")
+            asyncio.run(scenario(args))
+
+if __name__ == "__main__":
+    main()
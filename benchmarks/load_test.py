@@ -0,0 +1,93 @@
+# benchmarks/load_test.py
+# Compares concurrent throughput of GET /destinations/{user_name} on the old sync
+# path (def endpoint + src.db, bounded by Starlette's threadpool) and the async path
+# (API/main.py + src.async_db). Both run against SQLite with the same simulated
+# network latency per backend call, so the difference is purely how waiting is done.
+#
+#   python benchmarks/load_test.py --requests 2000 --concurrency 400 --latency 0.1
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("DB_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", ":memory:")
+
+import httpx
+from fastapi import FastAPI
+
+from src import async_db, db
+from src.backends import AsyncInlineBackend, Backend, ForwardingBackend, SQLiteBackend
+from API.main import app as async_app
+
+class SlowBackend(ForwardingBackend):
+    """Wraps a backend and blocks the calling thread for `latency` seconds per call, like a remote round trip."""
+
+    def __init__(self, inner: Backend, latency: float):
+        super().__init__(inner)
+        self.latency = latency
+
+    def _call(self, method: str, *args):
+        time.sleep(self.latency)
+        return super()._call(method, *args)
+
+class AsyncSlowBackend(AsyncInlineBackend):
+    """Same storage, but the simulated round trip is awaited instead of blocking."""
+
+    def __init__(self, sync_backend: SQLiteBackend, latency: float):
+        super().__init__(sync_backend)
+        self.latency = latency
+
+    async def _call(self, method: str, *args):
+        await asyncio.sleep(self.latency)
+        return await super()._call(method, *args)
+
+sync_app = FastAPI()
+
+@sync_app.get("/destinations/{user_name}")
+def get_destinations_by_user(user_name: str):
+    return db.get_destinations_by_user_name(user_name)
+
+def seed(backend: SQLiteBackend, users: int, per_user: int):
+    for i in range(users):
+        user = backend.insert("users", {"user_email": f"user{i}@example.com", "user_name": f"user{i}", "password": "secret"})[0]
+        for j in range(per_user):
+            backend.insert("destinations", {"user_id": user["user_id"], "destination_name": f"Place {j}", "country_name": "France", "is_visited": j % 2 == 0})
+
+async def run(app, requests: int, concurrency: int, users: int):
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i):
+            async with semaphore:
+                resp = await client.get(f"/destinations/user{i % users}")
+                resp.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async endpoint throughput")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.1, help="simulated seconds per backend call")
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+
+    sqlite = SQLiteBackend(":memory:")
+    seed(sqlite, args.users, per_user=20)
+    async_db.set_backend(SlowBackend(sqlite, args.latency))
+    async_db.backend = AsyncSlowBackend(sqlite, args.latency)
+
+    sync_rps = asyncio.run(run(sync_app, args.requests, args.concurrency, args.users))
+    db.user_id_cache.clear()
+    async_rps = asyncio.run(run(async_app, args.requests, args.concurrency, args.users))
+
+    print(f"sync  endpoints: {sync_rps:8.1f} req/s")
+    print(f"async endpoints: {async_rps:8.1f} req/s  ({async_rps / sync_rps:.1f}x)")
+
+if __name__ == "__main__":
+    main()
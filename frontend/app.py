@@ -2,12 +2,19 @@
 import streamlit as st
 import sys
 import os
+import time
+import functools
+import logging
 import pandas as pd
 
+# Start of this script run, for the render timings panel
+SCRIPT_STARTED = time.perf_counter()
+
 # Add parent directory to sys.path so 'src' can be imported
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.logic import TravelDairy, Destination
+from src.countries import normalize_country_series
 
 # ----------------------------
 # Initialize classes
@@ -64,6 +71,38 @@ if "destinations" not in st.session_state:
     st.session_state.destinations = []
 if "filter_visited" not in st.session_state:
     st.session_state.filter_visited = "All"
+if "stats" not in st.session_state:
+    st.session_state.stats = None
+if "data_version" not in st.session_state:
+    st.session_state.data_version = 0
+if "statistics_view" not in st.session_state:
+    st.session_state.statistics_view = None
+if "last_sync" not in st.session_state:
+    st.session_state.last_sync = 0.0
+if "sync_version" not in st.session_state:
+    st.session_state.sync_version = 0
+if "search_results" not in st.session_state:
+    st.session_state.search_results = None
+if "dest_page" not in st.session_state:
+    st.session_state.dest_page = 1
+if "dest_list_key" not in st.session_state:
+    st.session_state.dest_list_key = None
+if "editing_ids" not in st.session_state:
+    st.session_state.editing_ids = set()
+if "confirm_delete_ids" not in st.session_state:
+    st.session_state.confirm_delete_ids = set()
+if "render_timings" not in st.session_state:
+    st.session_state.render_timings = {}
+
+# Destinations rendered per page; only the visible window is built on each rerun
+PAGE_SIZES = [10, 25, 50, 100]
+
+# Runs kept per scope in the render timings panel
+TIMINGS_KEPT = 20
+timing_log = logging.getLogger("travel_diary.timings")
+
+# Local state is delta-synced with the backend at most this often
+RECONCILE_SECONDS = 60
 
 # ----------------------------
 # Helper Functions
@@ -75,67 +114,319 @@ def rerun():
     else:
         st.rerun()
 
+def record_timing(scope, seconds):
+    history = st.session_state.render_timings.setdefault(scope, [])
+    history.append(seconds * 1000)
+    del history[:-TIMINGS_KEPT]
+    timing_log.info("%s ran in %.1f ms", scope, seconds * 1000)
+
+def timed_fragment(func):
+    """st.fragment that also records how long each of its runs takes. Interacting with a
+    fragment reruns only that function, so these times sit next to the full script's."""
+    @st.fragment
+    @functools.wraps(func)
+    def fragment(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record_timing(func.__name__, time.perf_counter() - started)
+    return fragment
+
+def render_timings_panel():
+    timings = st.session_state.render_timings
+    if not timings:
+        return
+    with st.expander("⏱️ Render timings"):
+        st.dataframe(pd.DataFrame([
+            {"Scope": scope, "Runs": len(history), "Last (ms)": round(history[-1], 1),
+             "Mean (ms)": round(sum(history) / len(history), 1)}
+            for scope, history in timings.items()
+        ]), hide_index=True)
+
 def refresh_destinations():
     """Refresh destinations from backend"""
+    st.session_state.stats = None
+    st.session_state.data_version += 1
+    st.session_state.last_sync = time.time()
     try:
         result = destination_logic.get_all_destinations(st.session_state.user_name)
         if result.get("Success"):
             st.session_state.destinations = result.get("Data", [])
+            st.session_state.sync_version = max((d.get("version") or 0 for d in st.session_state.destinations), default=0)
         else:
             st.error("Failed to refresh destinations")
     except Exception as e:
         st.error(f"Error refreshing destinations: {str(e)}")
 
-def normalize_country_name(country_name):
-    """Normalize country names for consistent counting"""
-    if not country_name:
-        return ""
-    
-    # Convert to lowercase and strip whitespace
-    normalized = country_name.strip().lower()
-    
-    # Common normalization rules
-    country_aliases = {
-        'usa': 'united states',
-        'u.s.a.': 'united states',
-        'us': 'united states',
-        'u.s.': 'united states',
-        'uk': 'united kingdom',
-        'u.k.': 'united kingdom',
-        'england': 'united kingdom',
-        'scotland': 'united kingdom',
-        'wales': 'united kingdom',
-    }
-    
-    return country_aliases.get(normalized, normalized)
+def patch_destinations(action, row):
+    """Apply a confirmed write to the local list instead of refetching every destination"""
+    destinations = st.session_state.destinations
+    if action == "add":
+        destinations = destinations + [row]
+    elif action == "update":
+        destinations = [row if d["destination_id"] == row["destination_id"] else d for d in destinations]
+    elif action == "delete":
+        destinations = [d for d in destinations if d["destination_id"] != row["destination_id"]]
+    st.session_state.destinations = destinations
+    st.session_state.stats = None
+    st.session_state.data_version += 1
+
+def apply_write(action, res):
+    """Patch the local list with a confirmed write. A queued (write-behind) write has no
+    complete row yet, so the delta sync reads it back instead."""
+    if res.get("Queued"):
+        sync_destinations()
+    else:
+        patch_destinations(action, res["Data"])
+
+def sync_destinations():
+    """Fetch only what changed since the last sync and merge it into the local list"""
+    if not st.session_state.sync_version:
+        refresh_destinations()
+        return
+    st.session_state.last_sync = time.time()
+    try:
+        result = destination_logic.get_changes(st.session_state.user_name, st.session_state.sync_version)
+        if not result.get("Success"):
+            st.error("Failed to sync destinations")
+            return
+        delta = result["Data"]
+        if delta["changed"] or delta["deleted"]:
+            by_id = {d["destination_id"]: d for d in st.session_state.destinations}
+            for row in delta["changed"]:
+                by_id[row["destination_id"]] = row
+            for destination_id in delta["deleted"]:
+                by_id.pop(destination_id, None)
+            st.session_state.destinations = sorted(by_id.values(), key=lambda d: d["destination_id"])
+            st.session_state.stats = None
+            st.session_state.data_version += 1
+        st.session_state.sync_version = delta["version"]
+    except Exception as e:
+        st.error(f"Error syncing destinations: {str(e)}")
+
+# Most search hits shown at once; the server ranks them best first
+SEARCH_LIMIT = 50
+
+def search_destinations(term):
+    """Ranked server-side search, reused until the term or the local data changes"""
+    key = (term, st.session_state.data_version)
+    cached = st.session_state.search_results
+    if cached and cached[0] == key:
+        return cached[1]
+    try:
+        result = destination_logic.search(st.session_state.user_name, term, SEARCH_LIMIT)
+        rows = result.get("Data", []) if result.get("Success") else []
+    except Exception as e:
+        st.error(f"Error searching destinations: {str(e)}")
+        return []
+    st.session_state.search_results = (key, rows)
+    return rows
+
+@timed_fragment
+def render_add_form():
+    """The add form reruns on its own until a destination is actually added."""
+    with st.expander("➕ Add New Destination", expanded=st.session_state.show_add_detailed):
+        with st.form(key="add_dest_form", clear_on_submit=True):
+            col1, col2 = st.columns(2)
+            with col1:
+                dest_name = st.text_input("📍 Destination Name *", key="form_dest_name")
+                country = st.text_input("🇺🇳 Country *", key="form_country_name")
+            with col2:
+                visited = st.checkbox("✅ Visited", key="form_visited")
+                notes = st.text_area("📝 Notes", key="form_notes", height=100)
+
+            submitted = st.form_submit_button("Add Destination")
+            if submitted:
+                if not dest_name or not country:
+                    st.error("Please fill in destination name and country")
+                else:
+                    with st.spinner("Adding destination..."):
+                        res = destination_logic.add_destination(
+                            st.session_state.user_name, dest_name, country, visited, notes
+                        )
+                        if res.get("Success"):
+                            st.success("✅ Destination added successfully!")
+                            apply_write("add", res)
+                            st.session_state.show_add_detailed = False
+                            rerun()
+                        else:
+                            st.error(f"❌ {res.get('Message')}")
+
+def open_editor(dest_id):
+    st.session_state.editing_ids.add(dest_id)
+
+def close_editor(dest_id):
+    st.session_state.editing_ids.discard(dest_id)
+    st.session_state.confirm_delete_ids.discard(dest_id)
+
+@timed_fragment
+def render_destination(dest):
+    """One destination card, rerun on its own when its widgets are used. The edit form is
+    only built for cards being edited, so per-rerun cost stays bounded by the visible page;
+    widget keys use destination_id."""
+    dest_id = dest["destination_id"]
+    status = "✅ Visited" if dest.get('is_visited', False) else "🟡 Planned"
+    editing = dest_id in st.session_state.editing_ids
+
+    with st.expander(f"🌍 {dest['destination_name']} ({dest['country_name']}) - {status}", expanded=editing):
+        col1, col2 = st.columns([3, 1])
+
+        with col1:
+            st.write(f"**Country:** {dest['country_name']}")
+            st.write(f"**Status:** {status}")
+            st.write(f"**Notes:** {dest.get('notes') or 'No notes'}")
+
+        with col2:
+            if dest.get('is_visited', False):
+                st.success("✅ Visited")
+            else:
+                st.warning("🟡 Planned")
+            if not editing:
+                st.button("✏️ Edit", key=f"edit_{dest_id}", use_container_width=True,
+                          on_click=open_editor, args=(dest_id,))
+
+        if editing:
+            render_edit_form(dest)
+
+def render_edit_form(dest):
+    dest_id = dest["destination_id"]
+    with st.form(key=f"upd_form_{dest_id}"):
+        col1, col2 = st.columns(2)
+        with col1:
+            new_name = st.text_input("Destination Name", value=dest['destination_name'], key=f"name_{dest_id}")
+            new_country = st.text_input("Country", value=dest['country_name'], key=f"country_{dest_id}")
+        with col2:
+            new_visited = st.checkbox("Visited", value=dest['is_visited'], key=f"visited_{dest_id}")
+            new_notes = st.text_area("Notes", value=dest.get('notes') or '', key=f"notes_{dest_id}", height=100)
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            update_submitted = st.form_submit_button("💾 Update", use_container_width=True)
+        with col2:
+            delete_submitted = st.form_submit_button("🗑️ Delete", use_container_width=True)
+        with col3:
+            st.form_submit_button("✖️ Close", use_container_width=True, on_click=close_editor, args=(dest_id,))
+
+    if update_submitted:
+        with st.spinner("Updating destination..."):
+            upd_res = destination_logic.update_destination(
+                dest_id, new_name, new_country, new_visited, new_notes
+            )
+            if upd_res.get("Success"):
+                st.success("✅ Destination updated successfully!")
+                apply_write("update", upd_res)
+                close_editor(dest_id)
+                rerun()
+            else:
+                st.error(f"❌ {upd_res.get('Message')}")
+
+    if delete_submitted:
+        st.session_state.confirm_delete_ids.add(dest_id)
+
+    # Double confirmation for delete; plain buttons cannot live inside the form
+    if dest_id in st.session_state.confirm_delete_ids:
+        st.warning(f"Are you sure you want to delete {dest['destination_name']}?")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("✅ Yes, Delete", key=f"confirm_del_{dest_id}"):
+                with st.spinner("Deleting destination..."):
+                    del_res = destination_logic.delete_destination(dest_id)
+                    if del_res.get("Success"):
+                        st.success("✅ Destination deleted successfully!")
+                        apply_write("delete", del_res)
+                        close_editor(dest_id)
+                        rerun()
+                    else:
+                        st.error(f"❌ {del_res.get('Message')}")
+        with col2:
+            st.button("❌ Cancel", key=f"cancel_del_{dest_id}",
+                      on_click=st.session_state.confirm_delete_ids.discard, args=(dest_id,))
+
+def reconcile_destinations():
+    """Background reconciliation: delta-sync at most every RECONCILE_SECONDS"""
+    if time.time() - st.session_state.last_sync >= RECONCILE_SECONDS:
+        sync_destinations()
+
+EMPTY_STATS = {"total": 0, "visited": 0, "countries": 0, "percentage": 0, "unique_countries": [], "country_counts": {}}
 
 def get_travel_stats():
-    """Calculate travel statistics with proper country counting"""
-    destinations = st.session_state.destinations
-    if not destinations:
-        return {"total": 0, "visited": 0, "countries": 0, "percentage": 0}
-    
-    total = len(destinations)
-    visited = len([d for d in destinations if d.get('is_visited', False)])
-    
-    # Count unique countries with normalization
-    unique_countries = set()
-    for dest in destinations:
-        country = dest.get('country_name', '').strip()
-        if country:  # Only add non-empty country names
-            normalized_country = normalize_country_name(country)
-            unique_countries.add(normalized_country)
-    
-    countries_count = len(unique_countries)
-    
+    """Travel statistics aggregated by the database, fetched once per data change"""
+    if st.session_state.stats is None:
+        result = destination_logic.get_stats(st.session_state.user_name)
+        st.session_state.stats = result["Data"] if result.get("Success") else EMPTY_STATS
+    return st.session_state.stats
+
+DESTINATION_COLUMNS = ["destination_id", "destination_name", "country_name", "country_key", "is_visited", "notes"]
+
+def build_destinations_frame(destinations):
+    """One DataFrame of the user's destinations with clean, typed columns"""
+    df = pd.DataFrame(destinations, columns=DESTINATION_COLUMNS)
+    df["is_visited"] = df["is_visited"].fillna(False).astype(bool)
+    df["notes"] = df["notes"].fillna("").astype(str)
+    # Rows written before country_key existed are normalized here, once per distinct spelling
+    missing_key = df["country_key"].isna() | (df["country_key"] == "")
+    if missing_key.any():
+        df.loc[missing_key, "country_key"] = normalize_country_series(df.loc[missing_key, "country_name"])
+    return df
+
+def build_statistics_view(df):
+    """Everything the Statistics page shows, from groupby and vectorized string ops"""
+    total = len(df)
+    visited = int(df["is_visited"].sum())
+    country_counts = df.loc[df["country_key"] != "", "country_key"].value_counts().sort_index()
+    notes = df["notes"]
     return {
         "total": total,
         "visited": visited,
-        "countries": countries_count,
+        "countries": len(country_counts),
         "percentage": (visited / total * 100) if total > 0 else 0,
-        "unique_countries": list(unique_countries)
+        "status_chart": pd.DataFrame(
+            {"Count": [visited, total - visited]}, index=pd.Index(["Visited", "Not Visited"], name="Status")
+        ),
+        # Show top 10 countries only to avoid clutter
+        "top_countries": df["country_name"].value_counts().nlargest(10).rename("Destinations").rename_axis("Country").to_frame(),
+        "country_counts": country_counts,
+        "table": pd.DataFrame({
+            "Destination": df["destination_name"],
+            "Country": df["country_name"],
+            "Status": df["is_visited"].map({True: "Visited", False: "Planned"}),
+            "Notes": notes.where(notes.str.len() <= 50, notes.str[:50] + "..."),
+        }),
     }
 
+@timed_fragment
+def render_quick_stats():
+    stats = get_travel_stats()
+    st.markdown("### 📈 Quick Stats")
+    st.markdown(f"**Total Destinations:** {stats['total']}")
+    st.markdown(f"**Visited:** {stats['visited']}")
+    st.markdown(f"**Unique Countries:** {stats['countries']}")
+
+@timed_fragment
+def render_statistics_charts(view):
+    col1, col2 = st.columns(2)
+
+    with col1:
+        # Visited vs Not Visited Chart
+        st.bar_chart(view["status_chart"])
+        st.caption("Visited vs Not Visited Destinations")
+
+    with col2:
+        # Countries breakdown
+        if not view["top_countries"].empty:
+            st.bar_chart(view["top_countries"])
+            st.caption("Top Countries by Destinations")
+
+def get_statistics_view():
+    """Statistics page data, rebuilt only when the destinations data version changes"""
+    cached = st.session_state.statistics_view
+    if cached is None or cached[0] != st.session_state.data_version:
+        df = build_destinations_frame(st.session_state.destinations)
+        cached = (st.session_state.data_version, build_statistics_view(df))
+        st.session_state.statistics_view = cached
+    return cached[1]
+
 # ----------------------------
 # LOGIN / SIGNUP
 # ----------------------------
@@ -194,6 +485,8 @@ if not st.session_state.user_name:
 # MAIN APP AFTER LOGIN
 # ----------------------------
 if st.session_state.user_name:
+    reconcile_destinations()
+
     # Sidebar Navigation
     with st.sidebar:
         st.markdown(f"### 👋 Hello, {st.session_state.user_name}!")
@@ -210,21 +503,25 @@ if st.session_state.user_name:
         st.session_state.page = page
         
         # Quick Stats in Sidebar
-        stats = get_travel_stats()
         st.write("---")
-        st.markdown("### 📈 Quick Stats")
-        st.markdown(f"**Total Destinations:** {stats['total']}")
-        st.markdown(f"**Visited:** {stats['visited']}")
-        st.markdown(f"**Unique Countries:** {stats['countries']}")
+        render_quick_stats()
         
         st.write("---")
         if st.button("🚪 Logout", use_container_width=True):
             st.session_state.user_name = ""
             st.session_state.page = "Login"
             st.session_state.destinations = []
+            st.session_state.stats = None
+            st.session_state.statistics_view = None
+            st.session_state.sync_version = 0
+            st.session_state.search_results = None
+            st.session_state.editing_ids = set()
+            st.session_state.confirm_delete_ids = set()
             st.success("Logged out successfully!")
             rerun()
 
+        render_timings_panel()
+
     # ----------------------------
     # DASHBOARD PAGE
     # ----------------------------
@@ -293,39 +590,14 @@ if st.session_state.user_name:
         st.subheader("🌍 Manage Destinations")
         
         # Add Destination Section
-        with st.expander("➕ Add New Destination", expanded=st.session_state.show_add_detailed):
-            with st.form(key="add_dest_form", clear_on_submit=True):
-                col1, col2 = st.columns(2)
-                with col1:
-                    dest_name = st.text_input("📍 Destination Name *", key="form_dest_name")
-                    country = st.text_input("🇺🇳 Country *", key="form_country_name")
-                with col2:
-                    visited = st.checkbox("✅ Visited", key="form_visited")
-                    notes = st.text_area("📝 Notes", key="form_notes", height=100)
-                
-                submitted = st.form_submit_button("Add Destination")
-                if submitted:
-                    if not dest_name or not country:
-                        st.error("Please fill in destination name and country")
-                    else:
-                        with st.spinner("Adding destination..."):
-                            res = destination_logic.add_destination(
-                                st.session_state.user_name, dest_name, country, visited, notes
-                            )
-                            if res.get("Success"):
-                                st.success("✅ Destination added successfully!")
-                                refresh_destinations()
-                                st.session_state.show_add_detailed = False
-                                rerun()
-                            else:
-                                st.error(f"❌ {res.get('Message')}")
+        render_add_form()
 
         # Filter and Search Section
         st.write("---")
         col1, col2, col3 = st.columns([2, 1, 1])
         
         with col1:
-            search_term = st.text_input("🔍 Search destinations...", placeholder="Search by name or country")
+            search_term = st.text_input("🔍 Search destinations...", placeholder="Search by name, country or notes")
         
         with col2:
             filter_visited = st.selectbox(
@@ -337,7 +609,7 @@ if st.session_state.user_name:
         with col3:
             st.write("")  # Spacer
             if st.button("🔄 Refresh", use_container_width=True):
-                refresh_destinations()
+                sync_destinations()
                 st.success("Destinations refreshed!")
 
         # Display Destinations
@@ -346,12 +618,8 @@ if st.session_state.user_name:
         filtered_destinations = st.session_state.destinations
         
         # Apply filters
-        if search_term:
-            filtered_destinations = [
-                d for d in filtered_destinations 
-                if search_term.lower() in d['destination_name'].lower() 
-                or search_term.lower() in d['country_name'].lower()
-            ]
+        if search_term.strip():
+            filtered_destinations = search_destinations(search_term.strip())
         
         if filter_visited == "Visited":
             filtered_destinations = [d for d in filtered_destinations if d.get('is_visited', False)]
@@ -360,70 +628,28 @@ if st.session_state.user_name:
 
         if not filtered_destinations:
             st.info("No destinations found matching your criteria.")
-        
-        for idx, dest in enumerate(filtered_destinations):
-            dest_id = dest["destination_id"]
-            status = "✅ Visited" if dest.get('is_visited', False) else "🟡 Planned"
-            
-            with st.expander(f"🌍 {dest['destination_name']} ({dest['country_name']}) - {status}", expanded=False):
-                col1, col2 = st.columns([3, 1])
-                
-                with col1:
-                    st.write(f"**Country:** {dest['country_name']}")
-                    st.write(f"**Status:** {status}")
-                    st.write(f"**Notes:** {dest.get('notes', 'No notes')}")
-                
-                with col2:
-                    if dest.get('is_visited', False):
-                        st.success("✅ Visited")
-                    else:
-                        st.warning("🟡 Planned")
-                
-                # Update/Delete Form
-                with st.form(key=f"upd_form_{dest_id}"):
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        new_name = st.text_input("Destination Name", value=dest['destination_name'], key=f"name_{dest_id}")
-                        new_country = st.text_input("Country", value=dest['country_name'], key=f"country_{dest_id}")
-                    with col2:
-                        new_visited = st.checkbox("Visited", value=dest['is_visited'], key=f"visited_{dest_id}")
-                        new_notes = st.text_area("Notes", value=dest.get('notes', ''), key=f"notes_{dest_id}", height=100)
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        update_submitted = st.form_submit_button("💾 Update", use_container_width=True)
-                    with col2:
-                        delete_submitted = st.form_submit_button("🗑️ Delete", use_container_width=True)
-
-                    if update_submitted:
-                        with st.spinner("Updating destination..."):
-                            upd_res = destination_logic.update_destination(
-                                dest_id, new_name, new_country, new_visited, new_notes
-                            )
-                            if upd_res.get("Success"):
-                                st.success("✅ Destination updated successfully!")
-                                refresh_destinations()
-                                rerun()
-                            else:
-                                st.error(f"❌ {upd_res.get('Message')}")
-
-                    if delete_submitted:
-                        # Double confirmation for delete
-                        st.warning(f"Are you sure you want to delete {dest['destination_name']}?")
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            if st.button("✅ Yes, Delete", key=f"confirm_del_{dest_id}"):
-                                with st.spinner("Deleting destination..."):
-                                    del_res = destination_logic.delete_destination(dest_id)
-                                    if del_res.get("Success"):
-                                        st.success("✅ Destination deleted successfully!")
-                                        refresh_destinations()
-                                        rerun()
-                                    else:
-                                        st.error(f"❌ {del_res.get('Message')}")
-                        with col2:
-                            if st.button("❌ Cancel", key=f"cancel_del_{dest_id}"):
-                                rerun()
+        else:
+            # A new search or filter starts again from the first page
+            list_key = (search_term.strip(), filter_visited)
+            if st.session_state.dest_list_key != list_key:
+                st.session_state.dest_list_key = list_key
+                st.session_state.dest_page = 1
+
+            col1, col2, col3 = st.columns([1, 1, 2])
+            with col1:
+                page_size = st.selectbox("Per page", PAGE_SIZES, key="dest_page_size")
+            page_count = max(1, -(-len(filtered_destinations) // page_size))
+            st.session_state.dest_page = min(st.session_state.dest_page, page_count)
+            with col2:
+                page_number = st.number_input("Page", min_value=1, max_value=page_count, step=1, key="dest_page")
+            start = (page_number - 1) * page_size
+            visible = filtered_destinations[start:start + page_size]
+            with col3:
+                st.write("")  # Spacer
+                st.caption(f"Showing {start + 1}–{start + len(visible)} of {len(filtered_destinations)}")
+
+            for dest in visible:
+                render_destination(dest)
 
     # ----------------------------
     # STATISTICS PAGE
@@ -431,95 +657,46 @@ if st.session_state.user_name:
     elif page == "📊 Statistics":
         st.subheader("📊 Travel Statistics")
         
-        stats = get_travel_stats()
+        view = get_statistics_view()
         
-        if stats["total"] == 0:
+        if view["total"] == 0:
             st.info("No travel data available yet. Start adding destinations to see statistics!")
         else:
             # Key Metrics
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("Total Destinations", stats["total"])
+                st.metric("Total Destinations", view["total"])
             with col2:
-                st.metric("Visited Destinations", stats["visited"])
+                st.metric("Visited Destinations", view["visited"])
             with col3:
-                st.metric("Unique Countries", stats["countries"])
+                st.metric("Unique Countries", view["countries"])
             with col4:
-                st.metric("Completion Rate", f"{stats['percentage']:.1f}%")
+                st.metric("Completion Rate", f"{view['percentage']:.1f}%")
             
             # Visualization
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Visited vs Not Visited Chart
-                visited_count = stats["visited"]
-                not_visited_count = stats["total"] - stats["visited"]
-                
-                chart_data = pd.DataFrame({
-                    'Status': ['Visited', 'Not Visited'],
-                    'Count': [visited_count, not_visited_count]
-                })
-                st.bar_chart(chart_data.set_index('Status'))
-                st.caption("Visited vs Not Visited Destinations")
-            
-            with col2:
-                # Countries breakdown
-                countries = {}
-                for dest in st.session_state.destinations:
-                    country = dest['country_name']
-                    countries[country] = countries.get(country, 0) + 1
-                
-                if countries:
-                    country_data = pd.DataFrame({
-                        'Country': list(countries.keys()),
-                        'Destinations': list(countries.values())
-                    })
-                    # Show top 10 countries only to avoid clutter
-                    top_countries = country_data.nlargest(10, 'Destinations')
-                    st.bar_chart(top_countries.set_index('Country'))
-                    st.caption("Top Countries by Destinations")
+            render_statistics_charts(view)
             
             # Country List
             st.write("---")
             st.subheader("🌍 Countries Visited")
-            if stats["unique_countries"]:
+            country_counts = view["country_counts"]
+            if not country_counts.empty:
                 countries_per_row = 4
-                unique_countries = sorted(stats["unique_countries"])
                 
                 # Display countries in a grid
-                rows = [unique_countries[i:i + countries_per_row] for i in range(0, len(unique_countries), countries_per_row)]
-                
-                for row in rows:
+                for start in range(0, len(country_counts), countries_per_row):
                     cols = st.columns(countries_per_row)
-                    for idx, country in enumerate(row):
+                    row = country_counts.iloc[start:start + countries_per_row]
+                    for idx, (country, count) in enumerate(row.items()):
                         with cols[idx]:
-                            # Count destinations per country
-                            country_dest_count = len([d for d in st.session_state.destinations 
-                                                    if normalize_country_name(d['country_name']) == country])
-                            st.metric(
-                                label=country.title(),
-                                value=country_dest_count
-                            )
+                            st.metric(label=country.title(), value=int(count))
             else:
                 st.info("No countries added yet.")
             
             # Detailed Statistics
             st.write("---")
             st.subheader("📋 Detailed Breakdown")
-            
-            # Create a DataFrame for better display
-            df_data = []
-            for dest in st.session_state.destinations:
-                df_data.append({
-                    'Destination': dest['destination_name'],
-                    'Country': dest['country_name'],
-                    'Status': 'Visited' if dest.get('is_visited', False) else 'Planned',
-                    'Notes': dest.get('notes', '')[:50] + '...' if len(dest.get('notes', '')) > 50 else dest.get('notes', '')
-                })
-            
-            if df_data:
-                df = pd.DataFrame(df_data)
-                st.dataframe(df, use_container_width=True, hide_index=True)
+            st.dataframe(view["table"], use_container_width=True, hide_index=True)
 
     # ----------------------------
     # PROFILE PAGE
@@ -591,4 +768,6 @@ st.markdown(
     "✈️ Travel Diary App • Made with Streamlit"
     "</div>",
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+
+record_timing("full script", time.perf_counter() - SCRIPT_STARTED)
\ No newline at end of file
@@ -0,0 +1,136 @@
+# src/admission.py
+import asyncio
+import time
+from collections import deque
+
+from src.cache import TTLCache
+from src.metrics import Counter, Gauge, registry
+
+SHED = registry.register(Counter(
+    "travel_diary_requests_shed_total",
+    "Requests turned away before reaching the backend, by route template and reason "
+    "(queue_full, queue_timeout, rate_limited).",
+    ["route", "reason"],
+))
+
+class ConcurrencyLimiter:
+    """At most `limit` requests in progress. Up to `max_queue` more wait, first come first
+    served, for at most `timeout` seconds; anything beyond that is refused straight away.
+    Event-loop only: not thread safe."""
+
+    def __init__(self, limit: int, max_queue: int, timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self._waiters = deque()
+
+    def queued(self):
+        return len(self._waiters)
+
+    async def acquire(self):
+        """None once a slot is held, otherwise why the request was refused."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot straight to the waiter, so `active` is already counted
+            await asyncio.wait_for(waiter, self.timeout)
+            return None
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # the slot arrived just as we gave up; pass it on
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return "queue_timeout"
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+class TokenBuckets:
+    """One token bucket per key: `rate` requests per second with bursts of up to `burst`.
+    A bucket left alone long enough to refill is dropped, so at most `maxsize` are kept."""
+
+    def __init__(self, rate: float, burst: float, maxsize: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = TTLCache(maxsize=maxsize, ttl=burst / rate)
+
+    def take(self, key):
+        """Spend a token: 0 if one was available, otherwise seconds until there will be."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key) or (self.burst, now)
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets.set(key, (tokens, now))
+            return (1 - tokens) / self.rate
+        self._buckets.set(key, (tokens - 1, now))
+        return 0
+
+class AdmissionController:
+    """Per-route concurrency limits with a bounded wait queue, plus an optional rate limit per
+    caller. `route_limits` overrides `concurrency` for single route templates; a limit of 0
+    means unlimited, and a rate of 0 turns rate limiting off."""
+
+    def __init__(self, concurrency: int, max_queue: int, queue_timeout: float,
+                 route_limits=None, rate: float = 0, burst: float = 1):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.route_limits = route_limits or {}
+        self.buckets = TokenBuckets(rate, burst) if rate > 0 else None
+        self._limiters = {}
+
+    def limiter(self, route: str):
+        """The route's limiter, or None if the route is unlimited."""
+        limiter = self._limiters.get(route)
+        if limiter is None:
+            limit = self.route_limits.get(route, self.concurrency)
+            if limit <= 0:
+                return None
+            limiter = self._limiters[route] = ConcurrencyLimiter(limit, self.max_queue, self.queue_timeout)
+        return limiter
+
+    def limiters(self):
+        """(route template, limiter) for every limited route seen so far."""
+        return list(self._limiters.items())
+
+    def rate_limit(self, key):
+        """Seconds the caller should wait before retrying, or 0 to go ahead."""
+        return self.buckets.take(key) if self.buckets is not None else 0
+
+def admission_gauges(get_controller):
+    """In-flight and queued gauges over whatever controller get_controller() returns.
+    Registered once, so swapping the controller does not duplicate the metric families."""
+    registry.register(Gauge(
+        "travel_diary_admission_in_flight",
+        "Requests holding a concurrency slot, by route template.",
+        ["route"],
+        function=lambda: {(route,): limiter.active for route, limiter in get_controller().limiters()},
+    ))
+    registry.register(Gauge(
+        "travel_diary_admission_queue_depth",
+        "Requests waiting for a concurrency slot, by route template.",
+        ["route"],
+        function=lambda: {(route,): limiter.queued() for route, limiter in get_controller().limiters()},
+    ))
+
+def parse_route_limits(text: str):
+    """"/signin=16,/destinations/{user_name}/export=4" -> {route template: limit}."""
+    limits = {}
+    for item in text.split(","):
+        if item.strip():
+            route, limit = item.rsplit("=", 1)
+            limits[route.strip()] = int(limit)
+    return limits
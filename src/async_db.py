@@ -0,0 +1,207 @@
+# src/async_db.py
+# Async mirror of src/db.py for the FastAPI endpoints. Same functions, same return
+# shapes; it shares the storage, the caches and the write-behind queue with the sync
+# module. Only the backend calls differ: validation, result shaping and bookkeeping are
+# the _helpers of src/db.py.
+import asyncio
+
+from src import db
+from src.backends import AsyncBackend, Backend, create_async_backend
+from src.singleflight import AsyncSingleFlight
+
+backend: AsyncBackend = create_async_backend(db.backend)
+
+# Same metric names as the sync flights in src/db.py
+destination_reads = AsyncSingleFlight("get_destinations_by_user_name")
+user_lookups = AsyncSingleFlight("authenticate_user")
+
+def set_backend(new_backend: Backend):
+    """Point both the sync and the async data layer at new_backend."""
+    global backend
+    db.set_backend(new_backend)
+    backend = create_async_backend(db.backend)
+
+async def warmup():
+    """Build the async client and open a pooled connection, e.g. from the API's startup hook."""
+    await backend.warmup()
+
+# Never touches the backend, so there is nothing to await
+destination_columns = db.destination_columns
+
+async def flush_writes():
+    """Write queued destination mutations now. The write-behind queue is shared with src/db.py
+    and flushes through its sync backend, so this runs on a worker thread."""
+    if db.write_queue is not None and not db.write_queue.idle():
+        await asyncio.to_thread(db.flush_writes)
+
+async def _flush_for_read(user_id):
+    await flush_writes()
+    return db._lost_writes(user_id)
+
+async def _get_user_id(user_name: str):
+    user_id = db.user_id_cache.get(user_name)
+    if user_id is None:
+        user_id = db._cache_user_id(user_name, await backend.select("users", {"user_name": user_name}, columns="user_id"))
+    return user_id
+
+async def _read_user(user_name: str):
+    user_id = await _get_user_id(user_name)
+    if user_id is None:
+        return None, {"Success": False, "Message": "User not found"}
+    return user_id, await _flush_for_read(user_id)
+
+async def get_data_version(user_name: str):
+    user_id = db._versioned_user(user_name)
+    return None if user_id is None else await backend.select_version(user_id)
+
+# ---------------- USERS ----------------
+
+async def insert_user(email: str, name: str, password: str):
+    rows = await backend.insert("users", db._new_user(email, name, password))
+    return db._user_result(rows, "Failed to create user")
+
+async def _select_user(name: str):
+    return await backend.select("users", {"user_name": name}, columns=db.AUTH_COLUMNS)
+
+async def authenticate_user(name: str, password: str):
+    return db._signed_in(name, password, await user_lookups.do(name, _select_user, name))
+
+async def get_all_users(limit=None, after=None, fields=None):
+    columns, error = db._columns(fields, db.USER_COLUMNS, "user_id")
+    if error: return error
+    rows = await backend.select("users", columns=columns, order_by="user_id", limit=db._fetch_size(limit), after=after)
+    return db._paged_result(rows, limit, after, "user_id", "No users found")
+
+async def update_user_by_name(name: str, new_email=None, new_name=None, new_password=None):
+    updates = db._user_updates(new_email, new_name, new_password)
+    if not updates: return {"Success": False, "Message": "Nothing to update."}
+    rows = await backend.update("users", updates, {"user_name": name})
+    db._forget_user_name(name, new_name)
+    return db._user_result(rows, "Failed to update user")
+
+async def delete_user_by_name(name: str):
+    await flush_writes()
+    rows = await backend.delete("users", {"user_name": name})
+    db._forget_users(name, rows)
+    return db._user_result(rows, "Failed to delete user")
+
+# ---------------- DESTINATIONS ----------------
+
+async def insert_destination(user_name: str, destination_name: str, country_name: str, is_visited=False, notes=None):
+    user_id = await _get_user_id(user_name)
+    if user_id is None:
+        return {"Success": False, "Message": "User not found"}
+    row = db._new_destination(user_id, destination_name, country_name, is_visited, notes)
+    if db.write_queue is not None:
+        return db._queue_insert(row)
+    rows = await backend.insert("destinations", row)
+    db._track_inserts(rows)
+    return db._first_row(rows, "Failed to add destination")
+
+async def get_destinations_by_user_name(user_name: str, limit=None, after=None, fields=None):
+    columns, error = db._columns(fields, db.DESTINATION_COLUMNS, "destination_id")
+    if error: return error
+    await flush_writes()
+    key = db._read_key(user_name, limit, after, columns)
+    res = await destination_reads.do(key, _read_destinations, user_name, limit, after, columns)
+    return db._lost_writes(db.user_id_cache.get(user_name)) or res
+
+async def _read_destinations(user_name: str, limit, after, columns: str):
+    user_id = db.user_id_cache.get(user_name)
+    if user_id is not None:
+        rows = await backend.select("destinations", {"user_id": user_id}, columns=columns, order_by="destination_id",
+                                    limit=db._fetch_size(limit), after=after)
+    else:
+        joined = await backend.select_user_destinations(user_name, db._fetch_size(limit), after, columns)
+        rows = db._joined_rows(user_name, joined)
+        if rows is None:
+            return {"Success": False, "Message": "User not found"}
+    return db._paged_result(rows, limit, after, "destination_id", "No destinations found")
+
+async def update_destination_by_id(destination_id: int, destination_name=None, country_name=None, is_visited=None, notes=None):
+    updates = db._destination_updates(destination_name, country_name, is_visited, notes)
+    if not updates: return {"Success": False, "Message": "Nothing to update."}
+    if db.write_queue is not None:
+        return db._queue_update(destination_id, updates)
+    rows = await backend.update("destinations", updates, {"destination_id": destination_id})
+    db._track_updates(rows)
+    return db._first_row(rows, "Failed to update destination")
+
+async def delete_destination_by_id(destination_id: int):
+    if db.write_queue is not None:
+        return db._queue_delete(destination_id)
+    rows = await backend.delete("destinations", {"destination_id": destination_id})
+    db._track_deletes(rows)
+    return db._first_row(rows, "Failed to delete destination")
+
+async def get_destination_changes(user_name: str, since: int = 0):
+    user_id, error = await _read_user(user_name)
+    if error: return error
+    changed, tombstones = await backend.select_changes(user_id, since)
+    return db._changes_result(user_id, since, changed, tombstones)
+
+# ---------------- SEARCH ----------------
+
+async def search_destinations(user_name: str, query: str, limit=20):
+    terms = db.query_terms(query)
+    if not terms:
+        return {"Success": False, "Message": "Empty search query"}
+    user_id, error = await _read_user(user_name)
+    if error: return error
+    candidates = await backend.search_destinations(user_id, terms, limit * db.SEARCH_CANDIDATES)
+    return db._search_result(candidates, terms, limit)
+
+# ---------------- STATISTICS ----------------
+
+async def get_destination_stats(user_name: str):
+    user_id, error = await _read_user(user_name)
+    if error: return error
+    stats = db.destination_counters.get(user_id)
+    if stats is None:
+        generation = db.destination_counters.generation(user_id)
+        rows = await backend.select("destinations", {"user_id": user_id}, columns=db.COUNTER_COLUMNS)
+        stats = db.destination_counters.load(user_id, rows, generation)
+    return {"Success": True, "Data": stats}
+
+async def check_destination_counters(user_name: str, repair=True):
+    user_id, error = await _read_user(user_name)
+    if error: return error
+    expected, counters, consistent = db._compare_counters(user_id, await backend.count_destinations(user_id))
+    if not consistent and repair:
+        generation = db.destination_counters.generation(user_id)
+        rows = await backend.select("destinations", {"user_id": user_id}, columns=db.COUNTER_COLUMNS)
+        db.destination_counters.load(user_id, rows, generation)
+    return db._check_result(expected, counters, consistent, repair)
+
+# ---------------- BULK DESTINATIONS ----------------
+
+async def insert_destinations(user_name: str, destinations: list):
+    too_many = db._check_bulk_size(destinations)
+    if too_many: return too_many
+    await flush_writes()
+    user_id = await _get_user_id(user_name)
+    if user_id is None:
+        return {"Success": False, "Message": "User not found"}
+
+    results, pending = db._prepare_inserts(user_id, destinations)
+    rows = await backend.insert_many("destinations", [row for _, row in pending]) if pending else []
+    db._track_inserts(rows)
+    return db._fill_results(results, pending, rows, "Failed to add destination")
+
+async def update_destinations(items: list):
+    too_many = db._check_bulk_size(items)
+    if too_many: return too_many
+    await flush_writes()
+    results, pending, batch = db._prepare_updates(items)
+    rows = await backend.update_many("destinations", "destination_id", batch) if batch else []
+    db._track_updates(rows)
+    return db._fill_results(results, pending, rows, "Failed to update destination", key="destination_id")
+
+async def delete_destinations(destination_ids: list):
+    too_many = db._check_bulk_size(destination_ids)
+    if too_many: return too_many
+    await flush_writes()
+    results, pending, unique_ids = db._prepare_deletes(destination_ids)
+    rows = await backend.delete_many("destinations", "destination_id", unique_ids) if unique_ids else []
+    db._track_deletes(rows)
+    return db._fill_results(results, pending, rows, "Failed to delete destination", key="destination_id")
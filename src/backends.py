@@ -0,0 +1,973 @@
+# src/backends.py
+import asyncio
+import inspect
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src.metrics import BACKEND_ERRORS, BACKEND_LATENCY
+from src.resilience import (RESILIENCE_EVENTS, BackendBusy, BackendTimeout, BackendUnavailable, CircuitOpenError,
+                            ResiliencePolicy, is_transient)
+from src.search import fold
+
+# ---------------- INTERFACE ----------------
+
+class Backend:
+    """Storage interface used by src/db.py. Every method returns a list of row dicts.
+
+    select() and select_user_destinations() support keyset pagination: rows are ordered
+    by the key column, only keys greater than `after` are returned, at most `limit` of them.
+    """
+
+    def select(self, table: str, filters=None, columns: str = "*", order_by=None, limit=None, after=None):
+        raise NotImplementedError
+
+    def insert(self, table: str, row: dict):
+        raise NotImplementedError
+
+    def update(self, table: str, updates: dict, filters: dict):
+        raise NotImplementedError
+
+    def delete(self, table: str, filters: dict):
+        raise NotImplementedError
+
+    def select_user_destinations(self, user_name: str, limit=None, after=None, columns: str = "*"):
+        """Return (user_id, destinations) for user_name in one call, or None if the user does not exist.
+        `columns` projects the destination rows and must include destination_id."""
+        raise NotImplementedError
+
+    def insert_many(self, table: str, rows: list):
+        """Insert all rows in one batch; returns the inserted rows in input order."""
+        raise NotImplementedError
+
+    def update_many(self, table: str, key: str, rows: list):
+        """Apply per-row updates in one batch. Each row carries its `key` column and only the
+        columns to change; rows whose key does not exist are skipped. Returns the updated rows."""
+        raise NotImplementedError
+
+    def delete_many(self, table: str, key: str, values: list):
+        """Delete every row whose `key` is in values in one call; returns the deleted rows."""
+        raise NotImplementedError
+
+    def count_destinations(self, user_id):
+        """Aggregate a user's destinations in the database: one row per
+        (country_key, country_name, is_visited) group with its `count`."""
+        raise NotImplementedError
+
+    def select_changes(self, user_id, since: int):
+        """Return (changed destination rows, tombstone rows) with a version greater than since."""
+        raise NotImplementedError
+
+    def select_version(self, user_id):
+        """The highest version among the user's destinations and tombstones, 0 if none. Every
+        destination write moves it, whichever process made the write."""
+        raise NotImplementedError
+
+    def search_destinations(self, user_id, terms: list, limit: int):
+        """Return up to limit of the user's destinations matching any of the (folded) terms
+        from a trigram index, best candidates first. Final ranking happens in src/search.py."""
+        raise NotImplementedError
+
+    def warmup(self):
+        """Open connections ahead of the first request; nothing to do by default."""
+
+class AsyncBackend:
+    """Async twin of Backend used by src/async_db.py; same methods, awaitable."""
+
+    async def select(self, table: str, filters=None, columns: str = "*", order_by=None, limit=None, after=None):
+        raise NotImplementedError
+
+    async def insert(self, table: str, row: dict):
+        raise NotImplementedError
+
+    async def update(self, table: str, updates: dict, filters: dict):
+        raise NotImplementedError
+
+    async def delete(self, table: str, filters: dict):
+        raise NotImplementedError
+
+    async def select_user_destinations(self, user_name: str, limit=None, after=None, columns: str = "*"):
+        raise NotImplementedError
+
+    async def insert_many(self, table: str, rows: list):
+        raise NotImplementedError
+
+    async def update_many(self, table: str, key: str, rows: list):
+        raise NotImplementedError
+
+    async def delete_many(self, table: str, key: str, values: list):
+        raise NotImplementedError
+
+    async def count_destinations(self, user_id):
+        raise NotImplementedError
+
+    async def select_changes(self, user_id, since: int):
+        raise NotImplementedError
+
+    async def select_version(self, user_id):
+        raise NotImplementedError
+
+    async def search_destinations(self, user_id, terms: list, limit: int):
+        raise NotImplementedError
+
+    async def warmup(self):
+        pass
+
+# ---------------- WRAPPERS ----------------
+# Timing, resilience and the async adapters all wrap another backend. Each implements a single
+# _call(method, *args); the storage methods are generated from the interface above, so a method
+# added to Backend and AsyncBackend is forwarded by every wrapper without touching them.
+
+# The storage calls of the interface. warmup is not one of them; wrappers forward it directly.
+BACKEND_METHODS = [name for name, member in vars(Backend).items()
+                   if callable(member) and not name.startswith("_") and name != "warmup"]
+
+def _forwarder(interface, name: str):
+    """A method of `interface` that hands the call to self._call(name, *args). Keyword
+    arguments are made positional, so wrappers can rely on e.g. the table coming first."""
+    signature = inspect.signature(getattr(interface, name))
+    parameters = [(parameter.name, parameter.default) for parameter in list(signature.parameters.values())[1:]]
+
+    def positional(args, kwargs):
+        if not kwargs:
+            return args
+        values = list(args)
+        for parameter, default in parameters[len(args):]:
+            if parameter in kwargs:
+                values.append(kwargs.pop(parameter))
+            elif default is inspect.Parameter.empty:
+                raise TypeError(f"{name}() missing argument {parameter!r}")
+            else:
+                values.append(default)
+        if kwargs:
+            raise TypeError(f"{name}() got unexpected arguments {', '.join(kwargs)}")
+        return values
+
+    if interface is AsyncBackend:
+        async def method(self, *args, **kwargs):
+            return await self._call(name, *positional(args, kwargs))
+    else:
+        def method(self, *args, **kwargs):
+            return self._call(name, *positional(args, kwargs))
+    method.__name__ = name
+    method.__signature__ = signature
+    method.__doc__ = getattr(Backend, name).__doc__
+    return method
+
+class ForwardingBackend(Backend):
+    """Base for wrappers around another backend: every storage call goes through _call."""
+
+    def __init__(self, backend: Backend):
+        self.backend = backend
+
+    def _call(self, method: str, *args):
+        return getattr(self.backend, method)(*args)
+
+    def warmup(self):
+        self.backend.warmup()
+
+class AsyncForwardingBackend(AsyncBackend):
+    """Async twin of ForwardingBackend."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def _call(self, method: str, *args):
+        return await getattr(self.backend, method)(*args)
+
+    async def warmup(self):
+        await self.backend.warmup()
+
+for _method in BACKEND_METHODS:
+    setattr(ForwardingBackend, _method, _forwarder(Backend, _method))
+    setattr(AsyncForwardingBackend, _method, _forwarder(AsyncBackend, _method))
+
+# ---------------- SUPABASE ----------------
+
+# The supabase package is imported on first use: it is slow to import and the SQLite
+# backend never needs it. Clients share one pooled httpx client per backend.
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+# supabase-py's own PostgREST timeout, which has to be set on the pool once we bring our own
+SUPABASE_TIMEOUT = 120
+
+def _supabase_http_options(async_client=False):
+    import httpx
+    from supabase import AsyncClientOptions, ClientOptions
+    limits = httpx.Limits(max_connections=SUPABASE_POOL_SIZE, max_keepalive_connections=SUPABASE_POOL_SIZE)
+    if async_client:
+        return AsyncClientOptions(httpx_client=httpx.AsyncClient(limits=limits, timeout=SUPABASE_TIMEOUT))
+    return ClientOptions(httpx_client=httpx.Client(limits=limits, timeout=SUPABASE_TIMEOUT))
+
+def _check_supabase_credentials(url, key):
+    if not url or not key:
+        raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set (or use DB_BACKEND=sqlite)")
+
+def _supabase_warmup_query(users_table):
+    return users_table.select("user_id").limit(1)
+
+def _supabase_filtered(query, filters):
+    for column, value in (filters or {}).items():
+        query = query.eq(column, value)
+    return query
+
+def _supabase_select(query, filters, order_by, limit, after):
+    query = _supabase_filtered(query, filters)
+    if order_by:
+        if after is not None:
+            query = query.gt(order_by, after)
+        query = query.order(order_by)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def _supabase_user_destinations(users_table, user_name, limit, after, columns):
+    # Embedded resource select: PostgREST follows destinations.user_id -> users.user_id;
+    # the order/limit/gt on "destinations" page the embedded rows, not the user row.
+    query = (users_table.select(f"user_id, destinations({columns})").eq("user_name", user_name)
+             .order("destination_id", foreign_table="destinations"))
+    if after is not None:
+        query = query.gt("destinations.destination_id", after)
+    if limit is not None:
+        query = query.limit(limit, foreign_table="destinations")
+    return query.limit(1)
+
+def _unpack_user_destinations(rows):
+    if not rows:
+        return None
+    return rows[0]["user_id"], rows[0].get("destinations") or []
+
+DESTINATION_COUNTS_SELECT = "country_key, country_name, is_visited, count()"
+
+def _supabase_changes(users_table, user_id, since):
+    # Both tables hang off users, so one embedded select fetches changed rows and tombstones
+    return (users_table.select("destinations(*), destination_tombstones(destination_id, version)")
+            .eq("user_id", user_id)
+            .gt("destinations.version", since)
+            .gt("destination_tombstones.version", since))
+
+def _unpack_changes(rows):
+    if not rows:
+        return [], []
+    return rows[0].get("destinations") or [], rows[0].get("destination_tombstones") or []
+
+def _supabase_version(users_table, user_id):
+    # The newest row of each table under the user, in one embedded select
+    query = users_table.select("destinations(version), destination_tombstones(version)").eq("user_id", user_id)
+    for table in ("destinations", "destination_tombstones"):
+        query = query.order("version", desc=True, foreign_table=table).limit(1, foreign_table=table)
+    return query
+
+def _unpack_version(rows):
+    changed, tombstones = _unpack_changes(rows)
+    return max((row["version"] for row in changed + tombstones if row.get("version") is not None), default=0)
+
+def _search_params(user_id, terms, limit):
+    # search_destinations() is a SQL function over a pg_trgm index (see README)
+    return {"p_user_id": user_id, "p_query": " ".join(terms), "p_limit": limit}
+
+def _update_groups(rows, key):
+    """[(updates, keys)] for a bulk update. PostgREST's UPDATE sets the same values on every
+    matched row, so rows with identical changes share one UPDATE ... WHERE key IN (keys).
+    Only the changed columns are sent: a column another writer changed meanwhile keeps its
+    value, and a row deleted meanwhile stays deleted."""
+    groups = {}
+    for row in rows:
+        updates = {column: value for column, value in row.items() if column != key}
+        groups.setdefault(tuple(sorted(updates.items())), (updates, []))[1].append(row[key])
+    return list(groups.values())
+
+class SupabaseBackend(Backend):
+    """Remote Supabase (PostgREST) backend, one HTTPS round trip per call.
+    `client` replaces the real client, e.g. with the in-process fake in benchmarks/, and
+    `async_client` the one create_async_backend() hands to AsyncSupabaseBackend."""
+
+    def __init__(self, url: str, key: str, client=None, async_client=None):
+        self.url = url
+        self.key = key
+        self._client = client
+        self.async_client = async_client
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Built on first use; httpx.Client is thread safe, so threadpool workers share its pool
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    _check_supabase_credentials(self.url, self.key)
+                    from supabase import create_client
+                    self._client = create_client(self.url, self.key, options=_supabase_http_options())
+        return self._client
+
+    def warmup(self):
+        _supabase_warmup_query(self.client.table("users")).execute()
+
+    def select(self, table: str, filters=None, columns: str = "*", order_by=None, limit=None, after=None):
+        query = self.client.table(table).select(columns)
+        return _supabase_select(query, filters, order_by, limit, after).execute().data
+
+    def insert(self, table: str, row: dict):
+        return self.client.table(table).insert(row).execute().data
+
+    def update(self, table: str, updates: dict, filters: dict):
+        query = self.client.table(table).update(updates)
+        return _supabase_filtered(query, filters).execute().data
+
+    def delete(self, table: str, filters: dict):
+        query = self.client.table(table).delete()
+        return _supabase_filtered(query, filters).execute().data
+
+    def select_user_destinations(self, user_name: str, limit=None, after=None, columns: str = "*"):
+        query = _supabase_user_destinations(self.client.table("users"), user_name, limit, after, columns)
+        return _unpack_user_destinations(query.execute().data)
+
+    def insert_many(self, table: str, rows: list):
+        return self.client.table(table).insert(rows).execute().data
+
+    def update_many(self, table: str, key: str, rows: list):
+        updated = []
+        for updates, keys in _update_groups(rows, key):
+            updated += self.client.table(table).update(updates).in_(key, keys).execute().data
+        return updated
+
+    def delete_many(self, table: str, key: str, values: list):
+        return self.client.table(table).delete().in_(key, values).execute().data
+
+    def count_destinations(self, user_id):
+        # PostgREST aggregate: non-aggregated columns become the GROUP BY (needs db-aggregates-enabled)
+        query = self.client.table("destinations").select(DESTINATION_COUNTS_SELECT).eq("user_id", user_id)
+        return query.execute().data
+
+    def select_changes(self, user_id, since: int):
+        return _unpack_changes(_supabase_changes(self.client.table("users"), user_id, since).execute().data)
+
+    def select_version(self, user_id):
+        return _unpack_version(_supabase_version(self.client.table("users"), user_id).execute().data)
+
+    def search_destinations(self, user_id, terms: list, limit: int):
+        return self.client.rpc("search_destinations", _search_params(user_id, terms, limit)).execute().data
+
+# ---------------- SQLITE ----------------
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
+    user_email TEXT UNIQUE NOT NULL,
+    user_name TEXT,
+    password TEXT,
+    signup_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_users_user_name ON users (user_name);
+
+CREATE TABLE IF NOT EXISTS destinations (
+    destination_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT REFERENCES users (user_id),
+    destination_name TEXT NOT NULL,
+    country_name TEXT NOT NULL,
+    is_visited BOOLEAN DEFAULT FALSE,
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    country_key TEXT,
+    version INTEGER
+);
+DROP INDEX IF EXISTS idx_destinations_user_id;
+CREATE INDEX IF NOT EXISTS idx_destinations_user_id_destination_id ON destinations (user_id, destination_id);
+"""
+
+# Columns added after the first release: (table, column, type), applied to older database files
+SQLITE_MIGRATIONS = [
+    ("destinations", "country_key", "TEXT"),
+    ("destinations", "version", "INTEGER"),
+]
+
+# Change tracking for delta sync: every insert/update stamps the row with the next value of a
+# global counter and every delete leaves a tombstone stamped the same way. Rows from before
+# versioning get one shared version so a sync from 0 still returns them. SQLiteBackend stamps
+# its own writes in the statement itself (see _versioned), so RETURNING sees the new version;
+# the triggers only stamp rows written some other way.
+SQLITE_CHANGE_TRACKING = """
+CREATE TABLE IF NOT EXISTS change_counter (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO change_counter (id, version) VALUES (1, 0);
+
+CREATE TABLE IF NOT EXISTS destination_tombstones (
+    destination_id INTEGER PRIMARY KEY,
+    user_id TEXT,
+    version INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_destinations_user_id_version ON destinations (user_id, version);
+CREATE INDEX IF NOT EXISTS idx_destination_tombstones_user_id_version ON destination_tombstones (user_id, version);
+
+DROP TRIGGER IF EXISTS destinations_version_insert;
+CREATE TRIGGER destinations_version_insert AFTER INSERT ON destinations
+WHEN NEW.version IS NULL BEGIN
+    UPDATE change_counter SET version = version + 1;
+    UPDATE destinations SET version = (SELECT version FROM change_counter) WHERE destination_id = NEW.destination_id;
+END;
+CREATE TRIGGER IF NOT EXISTS destinations_version_update AFTER UPDATE ON destinations
+WHEN NEW.version IS OLD.version BEGIN
+    UPDATE change_counter SET version = version + 1;
+    UPDATE destinations SET version = (SELECT version FROM change_counter) WHERE destination_id = NEW.destination_id;
+END;
+CREATE TRIGGER IF NOT EXISTS destinations_tombstone AFTER DELETE ON destinations BEGIN
+    UPDATE change_counter SET version = version + 1;
+    INSERT OR REPLACE INTO destination_tombstones (destination_id, user_id, version)
+    VALUES (OLD.destination_id, OLD.user_id, (SELECT version FROM change_counter));
+END;
+
+UPDATE change_counter SET version = version + 1 WHERE EXISTS (SELECT 1 FROM destinations WHERE version IS NULL);
+UPDATE destinations SET version = (SELECT version FROM change_counter) WHERE version IS NULL;
+"""
+
+# Search index: an FTS5 trigram index over a folded (lowercase, accent-free) copy of the
+# name, country and notes, kept in step with destinations by triggers. fold() is registered
+# on every connection, so writes must go through SQLiteBackend. The UPDATE trigger only
+# fires for the indexed columns, so the version stamping above does not churn it.
+SQLITE_SEARCH_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS destinations_search USING fts5(
+    destination_name, country_name, notes, tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS destinations_search_insert AFTER INSERT ON destinations BEGIN
+    INSERT INTO destinations_search (rowid, destination_name, country_name, notes)
+    VALUES (NEW.destination_id, fold(NEW.destination_name), fold(NEW.country_name), fold(NEW.notes));
+END;
+CREATE TRIGGER IF NOT EXISTS destinations_search_delete AFTER DELETE ON destinations BEGIN
+    DELETE FROM destinations_search WHERE rowid = OLD.destination_id;
+END;
+CREATE TRIGGER IF NOT EXISTS destinations_search_update
+AFTER UPDATE OF destination_name, country_name, notes ON destinations BEGIN
+    DELETE FROM destinations_search WHERE rowid = OLD.destination_id;
+    INSERT INTO destinations_search (rowid, destination_name, country_name, notes)
+    VALUES (NEW.destination_id, fold(NEW.destination_name), fold(NEW.country_name), fold(NEW.notes));
+END;
+"""
+
+# bm25 column weights, in SQLITE_SEARCH_INDEX column order
+SQLITE_SEARCH_WEIGHTS = "3.0, 2.0, 1.0"
+
+BOOLEAN_COLUMNS = {"is_visited"}
+
+# Tables whose rows carry a change-tracking version
+VERSIONED_TABLES = {"destinations"}
+BUMP_VERSION_SQL = "UPDATE change_counter SET version = version + 1"
+CURRENT_VERSION_SQL = "(SELECT version FROM change_counter)"
+
+class SQLiteBackend(Backend):
+    """Embedded SQLite backend with the same tables as the Supabase project, no network involved."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.create_function("fold", 1, lambda text: fold(text) if text is not None else None, deterministic=True)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.executescript(SQLITE_SCHEMA)
+            self._migrate()
+            self.conn.executescript(SQLITE_CHANGE_TRACKING)
+            has_index = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'destinations_search'").fetchone()
+            self.conn.executescript(SQLITE_SEARCH_INDEX)
+            if not has_index:
+                # Index the rows that predate the search table
+                self.conn.execute(
+                    "INSERT INTO destinations_search (rowid, destination_name, country_name, notes) "
+                    "SELECT destination_id, fold(destination_name), fold(country_name), fold(notes) FROM destinations"
+                )
+
+    def _migrate(self):
+        for table, column, column_type in SQLITE_MIGRATIONS:
+            existing = {info[1] for info in self.conn.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    def _execute(self, sql: str, params=()):
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def _execute_batch(self, statements):
+        """Run (sql, params) pairs in one transaction and return all rows they produced."""
+        rows = []
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                for sql, params in statements:
+                    rows.extend(self.conn.execute(sql, params).fetchall())
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        return [self._row_to_dict(row) for row in rows]
+
+    def _insert_sql(self, table: str, row: dict):
+        columns = [column for column in row if column != "version"]
+        placeholders = ["?" for _ in columns]
+        if table in VERSIONED_TABLES:
+            columns.append("version")
+            placeholders.append(CURRENT_VERSION_SQL)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(placeholders)}) RETURNING *",
+                [row[column] for column in columns if column != "version"])
+
+    def _update_sql(self, table: str, updates: dict, filters: dict):
+        updates = {column: value for column, value in updates.items() if column != "version"}
+        assignments = [f"{column} = ?" for column in updates]
+        if table in VERSIONED_TABLES:
+            assignments.append(f"version = {CURRENT_VERSION_SQL}")
+        where, params = self._where(filters)
+        return f"UPDATE {table} SET {', '.join(assignments)}{where} RETURNING *", list(updates.values()) + params
+
+    def _versioned(self, table: str, statements):
+        """Put a bump of the change counter before each write to a versioned table. Run in one
+        transaction, each write then stamps its rows with the new version itself."""
+        if table not in VERSIONED_TABLES:
+            return statements
+        return [step for statement in statements for step in ((BUMP_VERSION_SQL, ()), statement)]
+
+    def _row_to_dict(self, row):
+        data = dict(row)
+        for column in BOOLEAN_COLUMNS & data.keys():
+            if data[column] is not None:
+                data[column] = bool(data[column])
+        return data
+
+    def _where(self, filters, order_by=None, after=None):
+        conditions = [f"{column} = ?" for column in filters or {}]
+        params = list((filters or {}).values())
+        if order_by and after is not None:
+            conditions.append(f"{order_by} > ?")
+            params.append(after)
+        if not conditions:
+            return "", []
+        return " WHERE " + " AND ".join(conditions), params
+
+    def select(self, table: str, filters=None, columns: str = "*", order_by=None, limit=None, after=None):
+        where, params = self._where(filters, order_by, after)
+        sql = f"SELECT {columns} FROM {table}{where}"
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._execute(sql, params)
+
+    def insert(self, table: str, row: dict):
+        return self._execute_batch(self._versioned(table, [self._insert_sql(table, row)]))
+
+    def update(self, table: str, updates: dict, filters: dict):
+        return self._execute_batch(self._versioned(table, [self._update_sql(table, updates, filters)]))
+
+    def delete(self, table: str, filters: dict):
+        where, params = self._where(filters)
+        return self._execute(f"DELETE FROM {table}{where} RETURNING *", params)
+
+    def select_user_destinations(self, user_name: str, limit=None, after=None, columns: str = "*"):
+        # The page condition sits in the ON clause so a user with no (more) rows still comes back
+        projection = "d.*" if columns == "*" else ", ".join(f"d.{column.strip()}" for column in columns.split(","))
+        sql = (f"SELECT u.user_id AS owner_id, {projection} FROM users u "
+               "LEFT JOIN destinations d ON d.user_id = u.user_id AND d.destination_id > ? "
+               "WHERE u.user_name = ? ORDER BY d.destination_id")
+        params = [after if after is not None else -1, user_name]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = self._execute(sql, params)
+        if not rows:
+            return None
+        user_id = rows[0]["owner_id"]
+        destinations = []
+        for row in rows:
+            if row.pop("owner_id") == user_id and row["destination_id"] is not None:
+                destinations.append(row)
+        return user_id, destinations
+
+    def insert_many(self, table: str, rows: list):
+        return self._execute_batch(self._versioned(table, [self._insert_sql(table, row) for row in rows]))
+
+    def update_many(self, table: str, key: str, rows: list):
+        statements = []
+        for row in rows:
+            updates = {column: value for column, value in row.items() if column != key}
+            statements.append(self._update_sql(table, updates, {key: row[key]}))
+        return self._execute_batch(self._versioned(table, statements))
+
+    def delete_many(self, table: str, key: str, values: list):
+        if not values:
+            return []
+        placeholders = ", ".join("?" for _ in values)
+        return self._execute(f"DELETE FROM {table} WHERE {key} IN ({placeholders}) RETURNING *", list(values))
+
+    def count_destinations(self, user_id):
+        return self._execute(
+            "SELECT country_key, country_name, is_visited, COUNT(*) AS count FROM destinations "
+            "WHERE user_id = ? GROUP BY country_key, country_name, is_visited",
+            [user_id],
+        )
+
+    def select_changes(self, user_id, since: int):
+        with self.lock:
+            changed = self.conn.execute(
+                "SELECT * FROM destinations WHERE user_id = ? AND version > ? ORDER BY version", [user_id, since]
+            ).fetchall()
+            deleted = self.conn.execute(
+                "SELECT destination_id, version FROM destination_tombstones WHERE user_id = ? AND version > ?",
+                [user_id, since],
+            ).fetchall()
+        return [self._row_to_dict(row) for row in changed], [dict(row) for row in deleted]
+
+    def select_version(self, user_id):
+        return self._execute(
+            "SELECT max(coalesce((SELECT max(version) FROM destinations WHERE user_id = ?), 0), "
+            "coalesce((SELECT max(version) FROM destination_tombstones WHERE user_id = ?), 0)) AS version",
+            [user_id, user_id],
+        )[0]["version"]
+
+    def search_destinations(self, user_id, terms: list, limit: int):
+        grams = sorted({term[i:i + 3] for term in terms for i in range(len(term) - 2)})
+        if grams:
+            # Any shared trigram makes a candidate, so prefixes and typos still find the row
+            match = " OR ".join('"' + gram.replace('"', '""') + '"' for gram in grams)
+            return self._execute(
+                "SELECT d.* FROM destinations_search JOIN destinations d ON d.destination_id = destinations_search.rowid "
+                "WHERE destinations_search MATCH ? AND d.user_id = ? "
+                f"ORDER BY bm25(destinations_search, {SQLITE_SEARCH_WEIGHTS}) LIMIT ?",
+                [match, user_id, limit],
+            )
+        # Terms shorter than a trigram cannot use the index; scan just this user's rows, matching
+        # any term against the same folded text the index holds
+        conditions, params = [], [user_id]
+        for term in terms:
+            pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            conditions += [f"fold({column}) LIKE ? ESCAPE '\\'" for column in ("destination_name", "country_name", "notes")]
+            params += [pattern] * 3
+        return self._execute(
+            f"SELECT * FROM destinations WHERE user_id = ? AND ({' OR '.join(conditions)}) ORDER BY destination_id LIMIT ?",
+            params + [limit],
+        )
+
+# ---------------- ASYNC ----------------
+
+class AsyncSupabaseBackend(AsyncBackend):
+    """Supabase through the async client, so requests wait on the event loop instead of a worker thread."""
+
+    def __init__(self, url: str, key: str, client=None):
+        self.url = url
+        self.key = key
+        self.client = client
+        self._client_lock = asyncio.Lock()
+
+    async def _connect(self):
+        # acreate_client is a coroutine, so the client is built on first use inside the running loop
+        if self.client is None:
+            async with self._client_lock:
+                if self.client is None:
+                    _check_supabase_credentials(self.url, self.key)
+                    from supabase import acreate_client
+                    self.client = await acreate_client(self.url, self.key, options=_supabase_http_options(async_client=True))
+        return self.client
+
+    async def _table(self, table: str):
+        return (await self._connect()).table(table)
+
+    async def select(self, table: str, filters=None, columns: str = "*", order_by=None, limit=None, after=None):
+        query = (await self._table(table)).select(columns)
+        return (await _supabase_select(query, filters, order_by, limit, after).execute()).data
+
+    async def insert(self, table: str, row: dict):
+        return (await (await self._table(table)).insert(row).execute()).data
+
+    async def update(self, table: str, updates: dict, filters: dict):
+        query = (await self._table(table)).update(updates)
+        return (await _supabase_filtered(query, filters).execute()).data
+
+    async def delete(self, table: str, filters: dict):
+        query = (await self._table(table)).delete()
+        return (await _supabase_filtered(query, filters).execute()).data
+
+    async def select_user_destinations(self, user_name: str, limit=None, after=None, columns: str = "*"):
+        query = _supabase_user_destinations(await self._table("users"), user_name, limit, after, columns)
+        return _unpack_user_destinations((await query.execute()).data)
+
+    async def insert_many(self, table: str, rows: list):
+        return (await (await self._table(table)).insert(rows).execute()).data
+
+    async def update_many(self, table: str, key: str, rows: list):
+        # The groups touch disjoint rows, so their UPDATEs go out concurrently
+        queries = [(await self._table(table)).update(updates).in_(key, keys).execute()
+                   for updates, keys in _update_groups(rows, key)]
+        return [row for response in await asyncio.gather(*queries) for row in response.data]
+
+    async def delete_many(self, table: str, key: str, values: list):
+        return (await (await self._table(table)).delete().in_(key, values).execute()).data
+
+    async def count_destinations(self, user_id):
+        query = (await self._table("destinations")).select(DESTINATION_COUNTS_SELECT).eq("user_id", user_id)
+        return (await query.execute()).data
+
+    async def select_changes(self, user_id, since: int):
+        query = _supabase_changes(await self._table("users"), user_id, since)
+        return _unpack_changes((await query.execute()).data)
+
+    async def select_version(self, user_id):
+        query = _supabase_version(await self._table("users"), user_id)
+        return _unpack_version((await query.execute()).data)
+
+    async def search_destinations(self, user_id, terms: list, limit: int):
+        query = (await self._connect()).rpc("search_destinations", _search_params(user_id, terms, limit))
+        return (await query.execute()).data
+
+    async def warmup(self):
+        await _supabase_warmup_query(await self._table("users")).execute()
+
+class AsyncInlineBackend(AsyncForwardingBackend):
+    """Runs a sync backend directly on the event loop. Only for backends that never block
+    on the network, like SQLiteBackend, where a thread hop would cost more than the query."""
+
+    async def _call(self, method: str, *args):
+        return getattr(self.backend, method)(*args)
+
+    async def warmup(self):
+        await self._call("warmup")
+
+class AsyncThreadBackend(AsyncInlineBackend):
+    """Fallback for any other sync backend: each call is pushed to a worker thread."""
+
+    async def _call(self, method: str, *args):
+        return await asyncio.to_thread(getattr(self.backend, method), *args)
+
+# ---------------- INSTRUMENTATION ----------------
+
+# Calls without a table argument are recorded under the table(s) they read; every such
+# method of the interface needs an entry here
+CALL_TABLES = {
+    "select_user_destinations": "users+destinations",
+    "select_changes": "destinations+destination_tombstones",
+    "select_version": "destinations+destination_tombstones",
+    "count_destinations": "destinations",
+    "search_destinations": "destinations",
+}
+
+def _observe(method: str, args, started: float, failed: bool):
+    table = CALL_TABLES.get(method) or args[0]
+    if failed:
+        BACKEND_ERRORS.inc(table=table, operation=method)
+    BACKEND_LATENCY.observe(time.perf_counter() - started, table=table, operation=method)
+
+class TimedBackend(ForwardingBackend):
+    """Wraps a backend and records the latency of every call by table and operation (src/metrics.py)."""
+
+    def _call(self, method: str, *args):
+        started, failed = time.perf_counter(), True
+        try:
+            result = getattr(self.backend, method)(*args)
+            failed = False
+            return result
+        finally:
+            _observe(method, args, started, failed)
+
+class AsyncTimedBackend(AsyncForwardingBackend):
+    """Async twin of TimedBackend."""
+
+    async def _call(self, method: str, *args):
+        started, failed = time.perf_counter(), True
+        try:
+            result = await getattr(self.backend, method)(*args)
+            failed = False
+            return result
+        finally:
+            _observe(method, args, started, failed)
+
+# ---------------- RESILIENCE ----------------
+# Wrapped around TimedBackend, so every attempt (retries and hedges too) shows up in the
+# latency metrics. Policy, retry and circuit rules live in src/resilience.py.
+
+# Sync calls run on these threads so they can be timed out and hedged; a call that times out
+# is abandoned, not interrupted, and keeps its thread until the backend answers
+BACKEND_THREADS = int(os.getenv("BACKEND_THREADS", "32"))
+_executor = None
+_executor_lock = threading.Lock()
+
+def _backend_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BACKEND_THREADS, thread_name_prefix="backend")
+    return _executor
+
+class _PooledCall:
+    """One call submitted to the backend threads, noting when a worker actually starts it."""
+
+    def __init__(self, call, args):
+        self.started = threading.Event()
+        self.started_at = None
+        self.future = _backend_executor().submit(self._run, call, args)
+
+    def _run(self, call, args):
+        self.started_at = time.monotonic()
+        self.started.set()
+        return call(*args)
+
+class ResilientBackend(ForwardingBackend):
+    """Applies a ResiliencePolicy to every call: a timeout per operation, jittered retries
+    for reads, an optional hedged second request for slow destination reads, and a circuit
+    breaker that fails fast with CircuitOpenError while the backend keeps failing."""
+
+    def __init__(self, backend: Backend, policy: ResiliencePolicy):
+        super().__init__(backend)
+        self.policy = policy
+
+    def _attempt(self, method: str, args, timeout, hedge_after):
+        call = getattr(self.backend, method)
+        if timeout is None and hedge_after is None:
+            return call(*args)
+        primary = _PooledCall(call, args)
+        # Waiting for a free thread is this process being busy, not the backend being slow:
+        # the timeout and the hedge delay run from when the call starts
+        if not primary.started.wait(timeout):
+            if primary.future.cancel():
+                RESILIENCE_EVENTS.inc(operation=method, event="busy")
+                raise BackendBusy(f"No backend thread free for {method} within {timeout}s")
+            primary.started.wait()  # a worker picked it up just now
+        deadline = primary.started_at + timeout if timeout is not None else None
+        hedge_at = primary.started_at + hedge_after if hedge_after is not None else None
+        pending = {primary.future}
+        error = None
+        while pending:
+            wake_at = [at for at in (deadline, hedge_at) if at is not None]
+            wait_for = max(min(wake_at) - time.monotonic(), 0) if wake_at else None
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            if done:
+                continue
+            if deadline is not None and time.monotonic() >= deadline:
+                RESILIENCE_EVENTS.inc(operation=method, event="timeout")
+                raise BackendTimeout(f"{method} did not answer within {timeout}s")
+            if hedge_at is not None and time.monotonic() >= hedge_at:
+                RESILIENCE_EVENTS.inc(operation=method, event="hedge")
+                pending.add(_PooledCall(call, args).future)
+                hedge_at = None
+        raise error
+
+    def _call(self, method: str, *args):
+        policy = self.policy
+        attempts = policy.attempts(method)
+        for attempt in range(attempts):
+            try:
+                policy.breaker.before_call()
+            except CircuitOpenError:
+                RESILIENCE_EVENTS.inc(operation=method, event="rejected")
+                raise
+            try:
+                result = self._attempt(method, args, policy.timeout(method), policy.hedge_delay(method, args))
+            except BackendBusy:
+                policy.breaker.abandon()  # no verdict on the backend
+                raise
+            except Exception as e:
+                if not is_transient(e):
+                    policy.breaker.success()  # the backend answered, just not with rows
+                    raise
+                policy.breaker.failure()
+                if attempt + 1 == attempts:
+                    raise e if isinstance(e, BackendUnavailable) else BackendUnavailable(f"{method} failed: {e}") from e
+                RESILIENCE_EVENTS.inc(operation=method, event="retry")
+                time.sleep(policy.backoff_delay(attempt))
+            else:
+                policy.breaker.success()
+                return result
+
+class AsyncResilientBackend(AsyncForwardingBackend):
+    """Async twin of ResilientBackend; a call that loses a hedge or times out is cancelled."""
+
+    def __init__(self, backend: AsyncBackend, policy: ResiliencePolicy):
+        super().__init__(backend)
+        self.policy = policy
+
+    async def _attempt(self, method: str, args, timeout, hedge_after):
+        call = getattr(self.backend, method)
+        if timeout is None and hedge_after is None:
+            return await call(*args)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        pending = {asyncio.ensure_future(call(*args))}
+        hedged = hedge_after is None
+        error = None
+        try:
+            while pending:
+                remaining = deadline - loop.time() if deadline is not None else None
+                wait_for = remaining
+                if not hedged:
+                    wait_for = hedge_after if remaining is None else min(hedge_after, remaining)
+                done, pending = await asyncio.wait(pending, timeout=None if wait_for is None else max(wait_for, 0),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not done:
+                    if deadline is not None and loop.time() >= deadline:
+                        RESILIENCE_EVENTS.inc(operation=method, event="timeout")
+                        raise BackendTimeout(f"{method} did not answer within {timeout}s")
+                    RESILIENCE_EVENTS.inc(operation=method, event="hedge")
+                    pending.add(asyncio.ensure_future(call(*args)))
+                    hedged = True
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call(self, method: str, *args):
+        policy = self.policy
+        attempts = policy.attempts(method)
+        for attempt in range(attempts):
+            try:
+                policy.breaker.before_call()
+            except CircuitOpenError:
+                RESILIENCE_EVENTS.inc(operation=method, event="rejected")
+                raise
+            try:
+                result = await self._attempt(method, args, policy.timeout(method), policy.hedge_delay(method, args))
+            except asyncio.CancelledError:
+                policy.breaker.abandon()
+                raise
+            except Exception as e:
+                if not is_transient(e):
+                    policy.breaker.success()
+                    raise
+                policy.breaker.failure()
+                if attempt + 1 == attempts:
+                    raise e if isinstance(e, BackendUnavailable) else BackendUnavailable(f"{method} failed: {e}") from e
+                RESILIENCE_EVENTS.inc(operation=method, event="retry")
+                await asyncio.sleep(policy.backoff_delay(attempt))
+            else:
+                policy.breaker.success()
+                return result
+
+# ---------------- FACTORY ----------------
+
+def create_backend():
+    """Build the backend named by DB_BACKEND ("supabase" by default, or "sqlite")."""
+    kind = os.getenv("DB_BACKEND", "supabase").lower()
+    if kind == "sqlite":
+        return SQLiteBackend(os.getenv("SQLITE_PATH", "travel_diary.db"))
+    if kind == "supabase":
+        return SupabaseBackend(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    raise ValueError(f"Unknown DB_BACKEND: {kind}")
+
+def create_async_backend(sync_backend: Backend):
+    """Build the async counterpart of a sync backend, pointing at the same storage."""
+    if isinstance(sync_backend, ResilientBackend):
+        # Same policy object, so both layers share one circuit breaker
+        return AsyncResilientBackend(create_async_backend(sync_backend.backend), sync_backend.policy)
+    if isinstance(sync_backend, TimedBackend):
+        return AsyncTimedBackend(create_async_backend(sync_backend.backend))
+    if isinstance(sync_backend, SupabaseBackend):
+        return AsyncSupabaseBackend(sync_backend.url, sync_backend.key, client=sync_backend.async_client)
+    if isinstance(sync_backend, SQLiteBackend):
+        return AsyncInlineBackend(sync_backend)
+    return AsyncThreadBackend(sync_backend)
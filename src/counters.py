@@ -0,0 +1,152 @@
+# src/counters.py
+import itertools
+import threading
+from collections import Counter
+
+from src.cache import TTLCache
+from src.countries import normalize_country_name
+
+def country_key(row):
+    """The normalized country stored with the row, falling back for rows written before it existed."""
+    return row.get("country_key") or normalize_country_name(row["country_name"])
+
+class UserCounters:
+    """Travel stats for one user plus a per-destination snapshot, so updates and deletes
+    can take back exactly what the row used to contribute."""
+
+    def __init__(self):
+        self.total = 0
+        self.visited = 0
+        self.countries = Counter()
+        self.rows = {}
+
+    def add(self, destination_id, is_visited, country):
+        self.rows[destination_id] = (is_visited, country)
+        self.total += 1
+        self.visited += 1 if is_visited else 0
+        if country:
+            self.countries[country] += 1
+
+    def remove(self, destination_id):
+        is_visited, country = self.rows.pop(destination_id)
+        self.total -= 1
+        self.visited -= 1 if is_visited else 0
+        if country:
+            self.countries[country] -= 1
+            if not self.countries[country]:
+                del self.countries[country]
+
+    def snapshot(self):
+        return {
+            "total": self.total,
+            "visited": self.visited,
+            "countries": len(self.countries),
+            "percentage": (self.visited / self.total * 100) if self.total > 0 else 0,
+            "unique_countries": list(self.countries),
+            "country_counts": dict(self.countries)
+        }
+
+class DestinationCounters:
+    """Per-user travel stats kept up to date on every destination write, so reads are O(1).
+
+    Counters live in this process only. A user is loaded from source rows on first read and
+    dropped, so the next read rebuilds them, when anything looks inconsistent: a delta sync
+    returning rows that disagree with them (see reconcile) or the consistency check in
+    src/db.py. Each user also expires `ttl` seconds after loading, so a write made by another
+    process is picked up within that window.
+
+    Loading is a select followed by load(), and a write can land in between. Every write
+    moves the user's generation, so load() only keeps rows read under the generation the
+    caller saw before its select.
+    """
+
+    def __init__(self, maxsize=1024, ttl=30.0):
+        self._users = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Values are never reused, so an evicted generation (None) never matches a later one.
+        # A select outlives neither the ttl nor maxsize writes of other users.
+        self._generations = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _bump(self, user_id):
+        # Caller holds self._lock
+        self._generations.set(user_id, next(self._seq))
+
+    def generation(self, user_id):
+        """Read before selecting the rows for load()."""
+        with self._lock:
+            return self._generations.get(user_id)
+
+    def get(self, user_id):
+        with self._lock:
+            counters = self._users.get(user_id)
+            return counters.snapshot() if counters else None
+
+    def load(self, user_id, rows, generation):
+        """Rebuild a user's counters from their destination rows and return the stats. The
+        counters are only kept if no write of the user landed since generation() was read."""
+        counters = UserCounters()
+        for row in rows:
+            counters.add(row["destination_id"], bool(row["is_visited"]), country_key(row))
+        with self._lock:
+            if self._generations.get(user_id) == generation:
+                self._users.set(user_id, counters)
+            return counters.snapshot()
+
+    def record(self, row):
+        """Apply a newly inserted destination row."""
+        with self._lock:
+            self._bump(row.get("user_id"))
+            counters = self._users.get(row.get("user_id"))
+            if counters is not None and row["destination_id"] not in counters.rows:
+                counters.add(row["destination_id"], bool(row["is_visited"]), country_key(row))
+
+    def replace(self, row):
+        """Apply an updated destination row in place of its previous values."""
+        with self._lock:
+            self._bump(row.get("user_id"))
+            counters = self._users.get(row.get("user_id"))
+            if counters is None:
+                return
+            if row["destination_id"] not in counters.rows:
+                # We never saw this row, so the counters have drifted; rebuild on next read
+                self._users.invalidate(row["user_id"])
+                return
+            counters.remove(row["destination_id"])
+            counters.add(row["destination_id"], bool(row["is_visited"]), country_key(row))
+
+    def forget(self, row):
+        """Apply a deleted destination row."""
+        with self._lock:
+            self._bump(row.get("user_id"))
+            counters = self._users.get(row.get("user_id"))
+            if counters is None:
+                return
+            if row["destination_id"] in counters.rows:
+                counters.remove(row["destination_id"])
+            else:
+                # We never saw this row, so the counters have drifted; rebuild on next read
+                self._users.invalidate(row["user_id"])
+
+    def reconcile(self, user_id, changed, deleted):
+        """Check rows from a delta sync against the counters and drop the user if any of them
+        disagree, i.e. another process wrote them since the counters were loaded."""
+        with self._lock:
+            counters = self._users.get(user_id)
+            if counters is None:
+                return
+            stale = any(counters.rows.get(row["destination_id"]) != (bool(row["is_visited"]), country_key(row))
+                        for row in changed)
+            if stale or any(destination_id in counters.rows for destination_id in deleted):
+                self._bump(user_id)
+                self._users.invalidate(user_id)
+
+    def drop(self, user_id):
+        with self._lock:
+            self._bump(user_id)
+            self._users.invalidate(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self._generations.clear()
@@ -0,0 +1,330 @@
+# src/countries.py
+import unicodedata
+from functools import lru_cache
+
+# ISO 3166-1 countries: alpha-2|alpha-3|canonical name|other official names
+ISO_COUNTRIES = """\
+AW|ABW|aruba
+AF|AFG|afghanistan|islamic republic of afghanistan
+AO|AGO|angola|republic of angola
+AI|AIA|anguilla
+AX|ALA|åland islands
+AL|ALB|albania|republic of albania
+AD|AND|andorra|principality of andorra
+AE|ARE|united arab emirates
+AR|ARG|argentina|argentine republic
+AM|ARM|armenia|republic of armenia
+AS|ASM|american samoa
+AQ|ATA|antarctica
+TF|ATF|french southern territories
+AG|ATG|antigua and barbuda
+AU|AUS|australia
+AT|AUT|austria|republic of austria
+AZ|AZE|azerbaijan|republic of azerbaijan
+BI|BDI|burundi|republic of burundi
+BE|BEL|belgium|kingdom of belgium
+BJ|BEN|benin|republic of benin
+BQ|BES|caribbean netherlands|bonaire, sint eustatius and saba
+BF|BFA|burkina faso
+BD|BGD|bangladesh|people's republic of bangladesh
+BG|BGR|bulgaria|republic of bulgaria
+BH|BHR|bahrain|kingdom of bahrain
+BS|BHS|bahamas|commonwealth of the bahamas
+BA|BIH|bosnia and herzegovina|republic of bosnia and herzegovina
+BL|BLM|saint barthélemy
+BY|BLR|belarus|republic of belarus
+BZ|BLZ|belize
+BM|BMU|bermuda
+BO|BOL|bolivia|bolivia, plurinational state of|plurinational state of bolivia
+BR|BRA|brazil|federative republic of brazil
+BB|BRB|barbados
+BN|BRN|brunei|brunei darussalam
+BT|BTN|bhutan|kingdom of bhutan
+BV|BVT|bouvet island
+BW|BWA|botswana|republic of botswana
+CF|CAF|central african republic
+CA|CAN|canada
+CC|CCK|cocos islands|cocos (keeling) islands
+CH|CHE|switzerland|swiss confederation
+CL|CHL|chile|republic of chile
+CN|CHN|china|people's republic of china
+CI|CIV|côte d'ivoire|republic of côte d'ivoire
+CM|CMR|cameroon|republic of cameroon
+CD|COD|democratic republic of the congo|congo, the democratic republic of the
+CG|COG|republic of the congo|congo
+CK|COK|cook islands
+CO|COL|colombia|republic of colombia
+KM|COM|comoros|union of the comoros
+CV|CPV|cabo verde|republic of cabo verde
+CR|CRI|costa rica|republic of costa rica
+CU|CUB|cuba|republic of cuba
+CW|CUW|curaçao
+CX|CXR|christmas island
+KY|CYM|cayman islands
+CY|CYP|cyprus|republic of cyprus
+CZ|CZE|czechia|czech republic
+DE|DEU|germany|federal republic of germany
+DJ|DJI|djibouti|republic of djibouti
+DM|DMA|dominica|commonwealth of dominica
+DK|DNK|denmark|kingdom of denmark
+DO|DOM|dominican republic
+DZ|DZA|algeria|people's democratic republic of algeria
+EC|ECU|ecuador|republic of ecuador
+EG|EGY|egypt|arab republic of egypt
+ER|ERI|eritrea|the state of eritrea
+EH|ESH|western sahara
+ES|ESP|spain|kingdom of spain
+EE|EST|estonia|republic of estonia
+ET|ETH|ethiopia|federal democratic republic of ethiopia
+FI|FIN|finland|republic of finland
+FJ|FJI|fiji|republic of fiji
+FK|FLK|falkland islands|falkland islands (malvinas)
+FR|FRA|france|french republic
+FO|FRO|faroe islands
+FM|FSM|micronesia|federated states of micronesia|micronesia, federated states of
+GA|GAB|gabon|gabonese republic
+GB|GBR|united kingdom|united kingdom of great britain and northern ireland
+GE|GEO|georgia
+GG|GGY|guernsey
+GH|GHA|ghana|republic of ghana
+GI|GIB|gibraltar
+GN|GIN|guinea|republic of guinea
+GP|GLP|guadeloupe
+GM|GMB|gambia|republic of the gambia
+GW|GNB|guinea-bissau|republic of guinea-bissau
+GQ|GNQ|equatorial guinea|republic of equatorial guinea
+GR|GRC|greece|hellenic republic
+GD|GRD|grenada
+GL|GRL|greenland
+GT|GTM|guatemala|republic of guatemala
+GF|GUF|french guiana
+GU|GUM|guam
+GY|GUY|guyana|republic of guyana
+HK|HKG|hong kong|hong kong special administrative region of china
+HM|HMD|heard island and mcdonald islands
+HN|HND|honduras|republic of honduras
+HR|HRV|croatia|republic of croatia
+HT|HTI|haiti|republic of haiti
+HU|HUN|hungary
+ID|IDN|indonesia|republic of indonesia
+IM|IMN|isle of man
+IN|IND|india|republic of india
+IO|IOT|british indian ocean territory
+IE|IRL|ireland
+IR|IRN|iran|iran, islamic republic of|islamic republic of iran
+IQ|IRQ|iraq|republic of iraq
+IS|ISL|iceland|republic of iceland
+IL|ISR|israel|state of israel
+IT|ITA|italy|italian republic
+JM|JAM|jamaica
+JE|JEY|jersey
+JO|JOR|jordan|hashemite kingdom of jordan
+JP|JPN|japan
+KZ|KAZ|kazakhstan|republic of kazakhstan
+KE|KEN|kenya|republic of kenya
+KG|KGZ|kyrgyzstan|kyrgyz republic
+KH|KHM|cambodia|kingdom of cambodia
+KI|KIR|kiribati|republic of kiribati
+KN|KNA|saint kitts and nevis
+KR|KOR|south korea|korea, republic of
+KW|KWT|kuwait|state of kuwait
+LA|LAO|laos|lao people's democratic republic
+LB|LBN|lebanon|lebanese republic
+LR|LBR|liberia|republic of liberia
+LY|LBY|libya
+LC|LCA|saint lucia
+LI|LIE|liechtenstein|principality of liechtenstein
+LK|LKA|sri lanka|democratic socialist republic of sri lanka
+LS|LSO|lesotho|kingdom of lesotho
+LT|LTU|lithuania|republic of lithuania
+LU|LUX|luxembourg|grand duchy of luxembourg
+LV|LVA|latvia|republic of latvia
+MO|MAC|macao|macao special administrative region of china
+MF|MAF|saint martin|saint martin (french part)
+MA|MAR|morocco|kingdom of morocco
+MC|MCO|monaco|principality of monaco
+MD|MDA|moldova|moldova, republic of|republic of moldova
+MG|MDG|madagascar|republic of madagascar
+MV|MDV|maldives|republic of maldives
+MX|MEX|mexico|united mexican states
+MH|MHL|marshall islands|republic of the marshall islands
+MK|MKD|north macedonia|republic of north macedonia
+ML|MLI|mali|republic of mali
+MT|MLT|malta|republic of malta
+MM|MMR|myanmar|republic of myanmar
+ME|MNE|montenegro
+MN|MNG|mongolia
+MP|MNP|northern mariana islands|commonwealth of the northern mariana islands
+MZ|MOZ|mozambique|republic of mozambique
+MR|MRT|mauritania|islamic republic of mauritania
+MS|MSR|montserrat
+MQ|MTQ|martinique
+MU|MUS|mauritius|republic of mauritius
+MW|MWI|malawi|republic of malawi
+MY|MYS|malaysia
+YT|MYT|mayotte
+NA|NAM|namibia|republic of namibia
+NC|NCL|new caledonia
+NE|NER|niger|republic of the niger
+NF|NFK|norfolk island
+NG|NGA|nigeria|federal republic of nigeria
+NI|NIC|nicaragua|republic of nicaragua
+NU|NIU|niue
+NL|NLD|netherlands|kingdom of the netherlands
+NO|NOR|norway|kingdom of norway
+NP|NPL|nepal|federal democratic republic of nepal
+NR|NRU|nauru|republic of nauru
+NZ|NZL|new zealand
+OM|OMN|oman|sultanate of oman
+PK|PAK|pakistan|islamic republic of pakistan
+PA|PAN|panama|republic of panama
+PN|PCN|pitcairn
+PE|PER|peru|republic of peru
+PH|PHL|philippines|republic of the philippines
+PW|PLW|palau|republic of palau
+PG|PNG|papua new guinea|independent state of papua new guinea
+PL|POL|poland|republic of poland
+PR|PRI|puerto rico
+KP|PRK|north korea|democratic people's republic of korea|korea, democratic people's republic of
+PT|PRT|portugal|portuguese republic
+PY|PRY|paraguay|republic of paraguay
+PS|PSE|palestine|palestine, state of|the state of palestine
+PF|PYF|french polynesia
+QA|QAT|qatar|state of qatar
+RE|REU|réunion
+RO|ROU|romania
+RU|RUS|russia|russian federation
+RW|RWA|rwanda|rwandese republic
+SA|SAU|saudi arabia|kingdom of saudi arabia
+SD|SDN|sudan|republic of the sudan
+SN|SEN|senegal|republic of senegal
+SG|SGP|singapore|republic of singapore
+GS|SGS|south georgia and the south sandwich islands
+SH|SHN|saint helena|saint helena, ascension and tristan da cunha
+SJ|SJM|svalbard and jan mayen
+SB|SLB|solomon islands
+SL|SLE|sierra leone|republic of sierra leone
+SV|SLV|el salvador|republic of el salvador
+SM|SMR|san marino|republic of san marino
+SO|SOM|somalia|federal republic of somalia
+PM|SPM|saint pierre and miquelon
+RS|SRB|serbia|republic of serbia
+SS|SSD|south sudan|republic of south sudan
+ST|STP|sao tome and principe|democratic republic of sao tome and principe
+SR|SUR|suriname|republic of suriname
+SK|SVK|slovakia|slovak republic
+SI|SVN|slovenia|republic of slovenia
+SE|SWE|sweden|kingdom of sweden
+SZ|SWZ|eswatini|kingdom of eswatini
+SX|SXM|sint maarten|sint maarten (dutch part)
+SC|SYC|seychelles|republic of seychelles
+SY|SYR|syria|syrian arab republic
+TC|TCA|turks and caicos islands
+TD|TCD|chad|republic of chad
+TG|TGO|togo|togolese republic
+TH|THA|thailand|kingdom of thailand
+TJ|TJK|tajikistan|republic of tajikistan
+TK|TKL|tokelau
+TM|TKM|turkmenistan
+TL|TLS|timor-leste|democratic republic of timor-leste
+TO|TON|tonga|kingdom of tonga
+TT|TTO|trinidad and tobago|republic of trinidad and tobago
+TN|TUN|tunisia|republic of tunisia
+TR|TUR|türkiye|republic of türkiye
+TV|TUV|tuvalu
+TW|TWN|taiwan|taiwan, province of china
+TZ|TZA|tanzania|tanzania, united republic of|united republic of tanzania
+UG|UGA|uganda|republic of uganda
+UA|UKR|ukraine
+UM|UMI|united states minor outlying islands
+UY|URY|uruguay|eastern republic of uruguay
+US|USA|united states|united states of america
+UZ|UZB|uzbekistan|republic of uzbekistan
+VA|VAT|vatican city|holy see (vatican city state)
+VC|VCT|saint vincent and the grenadines
+VE|VEN|venezuela|bolivarian republic of venezuela|venezuela, bolivarian republic of
+VG|VGB|british virgin islands|virgin islands, british
+VI|VIR|u.s. virgin islands|virgin islands of the united states|virgin islands, u.s.
+VN|VNM|vietnam|socialist republic of viet nam|viet nam
+VU|VUT|vanuatu|republic of vanuatu
+WF|WLF|wallis and futuna
+WS|WSM|samoa|independent state of samoa
+YE|YEM|yemen|republic of yemen
+ZA|ZAF|south africa|republic of south africa
+ZM|ZMB|zambia|republic of zambia
+ZW|ZWE|zimbabwe|republic of zimbabwe
+"""
+
+# Common normalization rules beyond the ISO names and codes
+COUNTRY_ALIASES = {
+    'u.s.a.': 'united states',
+    'u.s.': 'united states',
+    'america': 'united states',
+    'uk': 'united kingdom',
+    'u.k.': 'united kingdom',
+    'england': 'united kingdom',
+    'scotland': 'united kingdom',
+    'wales': 'united kingdom',
+    'northern ireland': 'united kingdom',
+    'great britain': 'united kingdom',
+    'britain': 'united kingdom',
+    'holland': 'netherlands',
+    'the netherlands': 'netherlands',
+    'turkey': 'türkiye',
+    'korea': 'south korea',
+    'ivory coast': "côte d'ivoire",
+    'uae': 'united arab emirates',
+    'emirates': 'united arab emirates',
+    'burma': 'myanmar',
+    'swaziland': 'eswatini',
+    'macedonia': 'north macedonia',
+    'cape verde': 'cabo verde',
+    'east timor': 'timor-leste',
+    'vatican': 'vatican city',
+    'drc': 'democratic republic of the congo',
+}
+
+def _fold(text: str):
+    """Lowercase, drop accents and collapse whitespace: the form every index key is stored in."""
+    text = unicodedata.normalize("NFKD", text.strip().lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.split())
+
+def _build_index():
+    index = {}
+    for line in ISO_COUNTRIES.splitlines():
+        alpha2, alpha3, canonical, *names = line.split("|")
+        for alias in (alpha2, alpha3, canonical, *names):
+            index[_fold(alias)] = canonical
+    for alias, canonical in COUNTRY_ALIASES.items():
+        index[_fold(alias)] = canonical
+    return index
+
+# Built once at import: every known spelling or code -> canonical lowercase country name
+COUNTRY_INDEX = _build_index()
+
+@lru_cache(maxsize=4096)
+def normalize_country_name(country_name):
+    """Normalize country names for consistent counting"""
+    if not country_name:
+        return ""
+
+    key = _fold(country_name)
+    if key in COUNTRY_INDEX:
+        return COUNTRY_INDEX[key]
+    # "U.S.A" / "U.K" without the final dot
+    undotted = key.replace(".", "")
+    if undotted in COUNTRY_INDEX:
+        return COUNTRY_INDEX[undotted]
+    # Unknown country: lowercase and strip whitespace
+    return " ".join(country_name.lower().split())
+
+def normalize_country_names(country_names):
+    """Normalize a batch of names, resolving each distinct spelling once."""
+    resolved = {name: normalize_country_name(name) for name in set(country_names)}
+    return [resolved[name] for name in country_names]
+
+def normalize_country_series(series):
+    """Vectorized normalization of a pandas Series: map over its unique values only."""
+    mapping = {name: normalize_country_name(name) for name in series.dropna().unique()}
+    return series.map(mapping).fillna("")
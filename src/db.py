@@ -1,105 +1,592 @@
 # src/db_manager.py
+import atexit
 import os
-from supabase import create_client, Client
 from dotenv import load_dotenv
+from src.backends import Backend, ResilientBackend, TimedBackend, create_backend
+from src.cache import TTLCache
+from src.counters import DestinationCounters
+from src.countries import normalize_country_name
+from src.metrics import Gauge, registry
+from src.resilience import circuit_state_gauge, policy_from_env
+from src.search import query_terms, rank
+from src.singleflight import SingleFlight
+from src.versions import DataVersions
+from src.write_behind import FLUSHED, WriteBehindQueue, queue_depth_gauge
 
-# Load environment variables
+# Load environment variables and pick the storage backend (DB_BACKEND=supabase|sqlite)
 load_dotenv()
-url = os.getenv("SUPABASE_URL")
-key = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
+# Every backend call is timed by table and operation for /metrics (src/metrics.py) and runs
+# under the timeouts, read retries and circuit breaker of src/resilience.py
+resilience = policy_from_env()
+backend: Backend = ResilientBackend(TimedBackend(create_backend()), resilience)
+circuit_state_gauge(lambda: resilience.breaker)
+
+# user_name -> user_id lookups, shared by the destination endpoints
+user_id_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "300")),
+)
+registry.register(Gauge(
+    "travel_diary_user_id_cache",
+    "user_name -> user_id cache hits, misses, size and maxsize; misses cost a users lookup.",
+    ["stat"],
+    function=lambda: {(stat,): value for stat, value in user_id_cache.stats().items()},
+))
+
+# Incrementally maintained per-user travel stats (see src/counters.py)
+destination_counters = DestinationCounters(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("STATS_COUNTER_TTL", "30")),
+)
+COUNTER_COLUMNS = "destination_id, user_id, is_visited, country_name, country_key"
+
+# Per-user write tags that key the single-flight destination reads (see src/versions.py)
+data_versions = DataVersions(maxsize=int(os.getenv("USER_CACHE_SIZE", "1024")))
+
+# Concurrent identical reads (several tabs, client retries) share one backend call
+destination_reads = SingleFlight("get_destinations_by_user_name")
+user_lookups = SingleFlight("authenticate_user")
+
+# src/async_db.py has an async twin of every public function below that differs only in
+# awaiting the backend. Validation, result shaping and the cache, counter and version
+# bookkeeping live in the _helpers here, which both modules call.
+
+def set_backend(new_backend: Backend):
+    """Swap the storage backend, e.g. an in-memory SQLiteBackend for tests and benchmarks."""
+    global backend
+    flush_writes()  # queued writes belong to the old backend
+    backend = ResilientBackend(TimedBackend(new_backend), resilience)
+    resilience.breaker.success()  # failures of the old backend say nothing about this one
+    user_id_cache.clear()
+    destination_counters.clear()
+    data_versions.clear()
+
+def warmup():
+    """Build the backend client and open a connection now rather than on the first request."""
+    backend.warmup()
+
+def get_cache_stats():
+    return user_id_cache.stats()
+
+# Columns each call site reads. The password never leaves this module, and the list
+# endpoints' `fields=` can only narrow these.
+USER_COLUMNS = ["user_id", "user_email", "user_name", "signup_date"]
+AUTH_COLUMNS = "user_id, user_email, user_name, signup_date, password"
+DESTINATION_COLUMNS = ["destination_id", "user_id", "destination_name", "country_name", "country_key",
+                       "is_visited", "notes", "created_at", "version"]
+
+def _columns(fields, allowed, key: str):
+    """(column list for select, None) for a comma separated `fields`, always including the
+    pagination key; (None, error result) if a field is not allowed."""
+    if not fields:
+        return ", ".join(allowed), None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        return None, {"Success": False, "Message": f"Unknown field(s): {', '.join(unknown)}"}
+    return ", ".join(dict.fromkeys([key] + requested)), None
+
+def destination_columns(fields=None):
+    """The columns a destinations read with `fields` selects, or None if a field is unknown."""
+    columns, _ = _columns(fields, DESTINATION_COLUMNS, "destination_id")
+    return columns
+
+def _public_user(row):
+    return {column: value for column, value in row.items() if column != "password"}
+
+def _page(rows, limit, key: str):
+    """Trim a limit+1 fetch down to one page and return (rows, cursor of the next page or None)."""
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1][key]
+    return rows, None
+
+def _fetch_size(limit):
+    # Keyset pagination fetches one extra row to know whether another page exists
+    return limit + 1 if limit is not None else None
+
+def _paged_result(rows, limit, after, key: str, empty_message: str):
+    rows, next_cursor = _page(rows, limit, key)
+    # Past the first page an empty result just means the listing is exhausted
+    if not rows and after is None:
+        return {"Success": False, "Message": empty_message}
+    res = {"Success": True, "Data": rows}
+    if limit is not None:
+        res["NextCursor"] = next_cursor
+    return res
+
+def _destination_updates(destination_name=None, country_name=None, is_visited=None, notes=None):
+    updates = {}
+    if destination_name: updates["destination_name"] = destination_name
+    if country_name:
+        updates["country_name"] = country_name
+        updates["country_key"] = normalize_country_name(country_name)
+    if is_visited is not None: updates["is_visited"] = is_visited
+    if notes: updates["notes"] = notes
+    return updates
+
+def _cache_user_id(user_name: str, users):
+    """Remember the user_id of a users lookup; None if there is no such user."""
+    if not users:
+        return None
+    user_id_cache.set(user_name, users[0]["user_id"])
+    return users[0]["user_id"]
+
+def _get_user_id(user_name: str):
+    """Resolve a user_name to its user_id, hitting the backend only on a cache miss."""
+    user_id = user_id_cache.get(user_name)
+    if user_id is None:
+        user_id = _cache_user_id(user_name, backend.select("users", {"user_name": user_name}, columns="user_id"))
+    return user_id
+
+def _read_user(user_name: str):
+    """(user_id, None) once the user's queued writes are in, or (None, error result)."""
+    user_id = _get_user_id(user_name)
+    if user_id is None:
+        return None, {"Success": False, "Message": "User not found"}
+    return user_id, _flush_for_read(user_id)
+
+def _versioned_user(user_name: str):
+    # Queued writes have not been given a version yet, so no version can vouch for them
+    if write_queue is not None and not write_queue.idle():
+        return None
+    return user_id_cache.get(user_name)
+
+def get_data_version(user_name: str):
+    """The stored version of the user's destinations (Backend.select_version), which every
+    writing process moves; None while the user_id is not cached or writes are queued."""
+    user_id = _versioned_user(user_name)
+    return None if user_id is None else backend.select_version(user_id)
+
+# ---------------- WRITE-BEHIND ----------------
+# Opt-in with WRITE_BEHIND_WINDOW (seconds) > 0: insert_destination, update_destination_by_id
+# and delete_destination_by_id return {"Success": True, "Data": ..., "Queued": True} as soon as
+# the mutation is queued, and src/write_behind.py writes the queue in batches. Every read of
+# destinations flushes first, so a caller always reads its own writes. A failed flush stays
+# queued and the read fails with it; mutations given up on after WRITE_BEHIND_MAX_ATTEMPTS
+# are reported to the owning user's next read. Queued updates are not checked against the database: an
+# update of a destination_id that does not exist is acknowledged, then skipped by the flush.
+
+write_queue = None
+queue_depth_gauge(lambda: write_queue)
+
+def _count_flushed(operation: str, sent: int, rows):
+    FLUSHED.inc(len(rows), operation=operation, outcome="ok")
+    if sent > len(rows):
+        FLUSHED.inc(sent - len(rows), operation=operation, outcome="failed")
+
+def _write_pending(batch):
+    """Write one coalesced batch as bulk calls: inserts, then merged updates, then deletes.
+    Each part is cleared once written, so a failure leaves only what still has to be retried."""
+    if batch.inserts:
+        rows = backend.insert_many("destinations", batch.inserts)
+        _track_inserts(rows)
+        _count_flushed("insert", len(batch.inserts), rows)
+        batch.inserts = []
+    if batch.updates:
+        rows = backend.update_many("destinations", "destination_id", list(batch.updates.values()))
+        _track_updates(rows)
+        _count_flushed("update", len(batch.updates), rows)
+        batch.updates = {}
+    if batch.deletes:
+        rows = backend.delete_many("destinations", "destination_id", list(batch.deletes))
+        _track_deletes(rows)
+        _count_flushed("delete", len(batch.deletes), rows)
+        batch.deletes = {}
+
+def _destination_owners(destination_ids):
+    """destination_id -> user_id for those of destination_ids that still exist. Only runs for
+    mutations given up on, so one small select each is fine."""
+    owners = {}
+    for destination_id in destination_ids:
+        for row in backend.select("destinations", {"destination_id": destination_id}, columns="destination_id, user_id"):
+            owners[row["destination_id"]] = row["user_id"]
+    return owners
+
+def configure_write_behind(window: float, max_batch: int = 100, max_attempts: int = 5):
+    """Turn write-behind on (window > 0) or off. Anything already queued is written first."""
+    global write_queue
+    if write_queue is not None:
+        write_queue.close()
+    write_queue = (WriteBehindQueue(_write_pending, _destination_owners, window, max_batch, max_attempts)
+                   if window > 0 else None)
+
+def flush_writes():
+    """Write queued destination mutations now; a no-op when write-behind is off. If the write
+    fails the error is raised and the mutations stay queued for a retry."""
+    if write_queue is not None and not write_queue.idle():
+        write_queue.flush()
+
+def _lost_writes(user_id):
+    """An error result if queued mutations of user_id were given up on since its last read, else None."""
+    lost = write_queue.take_lost(user_id) if write_queue is not None and user_id is not None else 0
+    if lost:
+        return {"Success": False, "Message": f"{lost} queued destination change(s) could not be saved"}
+    return None
+
+def _flush_for_read(user_id):
+    flush_writes()
+    return _lost_writes(user_id)
+
+def _queued(data):
+    return {"Success": True, "Data": data, "Queued": True}
+
+def _queue_insert(row):
+    write_queue.insert(row)
+    return _queued(dict(row))
+
+def _queue_update(destination_id, updates):
+    if not write_queue.update(destination_id, updates):
+        return {"Success": False, "Message": "Failed to update destination"}
+    return _queued({"destination_id": destination_id, **updates})
+
+def _queue_delete(destination_id):
+    write_queue.delete(destination_id)
+    return _queued({"destination_id": destination_id})
+
+configure_write_behind(float(os.getenv("WRITE_BEHIND_WINDOW", "0")), int(os.getenv("WRITE_BEHIND_MAX_BATCH", "100")),
+                       int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "5")))
+atexit.register(configure_write_behind, 0)
 
 # ---------------- USERS ----------------
 
-def insert_user(email: str, name: str, password: str):
-    resp = supabase.table("users").insert({
-        "user_email": email,
-        "user_name": name,
-        "password": password
-    }).execute()
-    if resp.data:
-        return {"Success": True, "Data": resp.data[0]}
-    return {"Success": False, "Message": "Failed to create user"}
+def _new_user(email: str, name: str, password: str):
+    return {"user_email": email, "user_name": name, "password": password}
 
-def authenticate_user(name: str, password: str):
-    resp = supabase.table("users").select("*").eq("user_name", name).execute()
-    if resp.data:
-        user = resp.data[0]
-        if user["password"] == password:
-            return {"Success": True, "Data": user}
-        return {"Success": False, "Message": "Incorrect password"}
-    return {"Success": False, "Message": "User not found"}
-
-def get_all_users():
-    resp = supabase.table("users").select("*").execute()
-    if resp.data:
-        return {"Success": True, "Data": resp.data}
-    return {"Success": False, "Message": "No users found"}
+def _user_result(rows, message: str):
+    if rows:
+        return {"Success": True, "Data": _public_user(rows[0])}
+    return {"Success": False, "Message": message}
 
-def update_user_by_name(name: str, new_email=None, new_name=None, new_password=None):
+def _signed_in(name: str, password: str, rows):
+    if not rows:
+        return {"Success": False, "Message": "User not found"}
+    user = rows[0]
+    user_id_cache.set(name, user["user_id"])
+    if user["password"] == password:
+        return {"Success": True, "Data": _public_user(user)}
+    return {"Success": False, "Message": "Incorrect password"}
+
+def _user_updates(new_email=None, new_name=None, new_password=None):
     updates = {}
     if new_email: updates["user_email"] = new_email
     if new_name: updates["user_name"] = new_name
     if new_password: updates["password"] = new_password
-    if not updates: return {"Success": False, "Message": "Nothing to update."}
+    return updates
+
+def _forget_user_name(name: str, new_name=None):
+    user_id_cache.invalidate(name)
+    if new_name: user_id_cache.invalidate(new_name)
+
+def _forget_users(name: str, rows):
+    _forget_user_name(name)
+    for row in rows:
+        destination_counters.drop(row["user_id"])
+        data_versions.bump(row["user_id"])
+
+def insert_user(email: str, name: str, password: str):
+    rows = backend.insert("users", _new_user(email, name, password))
+    return _user_result(rows, "Failed to create user")
+
+def _select_user(name: str):
+    return backend.select("users", {"user_name": name}, columns=AUTH_COLUMNS)
+
+def authenticate_user(name: str, password: str):
+    # Concurrent sign-ins for one name share the lookup; each checks its own password
+    return _signed_in(name, password, user_lookups.do(name, _select_user, name))
+
+def get_all_users(limit=None, after=None, fields=None):
+    columns, error = _columns(fields, USER_COLUMNS, "user_id")
+    if error: return error
+    rows = backend.select("users", columns=columns, order_by="user_id", limit=_fetch_size(limit), after=after)
+    return _paged_result(rows, limit, after, "user_id", "No users found")
 
-    resp = supabase.table("users").update(updates).eq("user_name", name).execute()
-    if resp.data:
-        return {"Success": True, "Data": resp.data[0]}
-    return {"Success": False, "Message": "Failed to update user"}
+def update_user_by_name(name: str, new_email=None, new_name=None, new_password=None):
+    updates = _user_updates(new_email, new_name, new_password)
+    if not updates: return {"Success": False, "Message": "Nothing to update."}
+    rows = backend.update("users", updates, {"user_name": name})
+    _forget_user_name(name, new_name)
+    return _user_result(rows, "Failed to update user")
 
 def delete_user_by_name(name: str):
-    resp = supabase.table("users").delete().eq("user_name", name).execute()
-    if resp.data:
-        return {"Success": True, "Data": resp.data[0]}
-    return {"Success": False, "Message": "Failed to delete user"}
+    flush_writes()
+    rows = backend.delete("users", {"user_name": name})
+    _forget_users(name, rows)
+    return _user_result(rows, "Failed to delete user")
 
 # ---------------- DESTINATIONS ----------------
 
-def insert_destination(user_name: str, destination_name: str, country_name: str, is_visited=False, notes=None):
-    user_resp = supabase.table("users").select("*").eq("user_name", user_name).execute()
-    if not user_resp.data:
-        return {"Success": False, "Message": "User not found"}
-    user_id = user_resp.data[0]["user_id"]
-
-    resp = supabase.table("destinations").insert({
+def _new_destination(user_id, destination_name: str, country_name: str, is_visited=False, notes=None):
+    return {
         "user_id": user_id,
         "destination_name": destination_name,
         "country_name": country_name,
+        "country_key": normalize_country_name(country_name),
         "is_visited": is_visited,
         "notes": notes
-    }).execute()
+    }
+
+# Every destination write, single, bulk or write-behind, reports its rows here so the
+# counters and data versions follow it
+def _track_inserts(rows):
+    for row in rows: destination_counters.record(row)
+    _bump_versions(rows)
+
+def _track_updates(rows):
+    for row in rows: destination_counters.replace(row)
+    _bump_versions(rows)
 
-    if resp.data:
-        return {"Success": True, "Data": resp.data[0]}
-    return {"Success": False, "Message": "Failed to add destination"}
+def _track_deletes(rows):
+    for row in rows: destination_counters.forget(row)
+    _bump_versions(rows)
 
-def get_destinations_by_user_name(user_name: str):
-    user_resp = supabase.table("users").select("*").eq("user_name", user_name).execute()
-    if not user_resp.data:
+def _bump_versions(rows):
+    for user_id in {row["user_id"] for row in rows}: data_versions.bump(user_id)
+
+def _first_row(rows, message: str):
+    if rows:
+        return {"Success": True, "Data": rows[0]}
+    return {"Success": False, "Message": message}
+
+def insert_destination(user_name: str, destination_name: str, country_name: str, is_visited=False, notes=None):
+    user_id = _get_user_id(user_name)
+    if user_id is None:
         return {"Success": False, "Message": "User not found"}
-    user_id = user_resp.data[0]["user_id"]
+    row = _new_destination(user_id, destination_name, country_name, is_visited, notes)
+    if write_queue is not None:
+        return _queue_insert(row)
+    rows = backend.insert("destinations", row)
+    _track_inserts(rows)
+    return _first_row(rows, "Failed to add destination")
+
+def get_destinations_by_user_name(user_name: str, limit=None, after=None, fields=None):
+    columns, error = _columns(fields, DESTINATION_COLUMNS, "destination_id")
+    if error: return error
+    flush_writes()
+    key = _read_key(user_name, limit, after, columns)
+    res = destination_reads.do(key, _read_destinations, user_name, limit, after, columns)
+    # Checked after the read, which caches the user_id if it was not known yet
+    return _lost_writes(user_id_cache.get(user_name)) or res
+
+def _read_key(user_name: str, limit, after, columns: str):
+    # The write tag is part of the key, so a read that starts after a write completed never
+    # joins a call that started before it
+    user_id = user_id_cache.get(user_name)
+    return (user_name, limit, after, columns, None if user_id is None else data_versions.current(user_id))
+
+def _joined_rows(user_name: str, joined):
+    """The destinations of a select_user_destinations result, caching the user_id on the
+    way; None if the user does not exist."""
+    if joined is None:
+        return None
+    user_id, rows = joined
+    user_id_cache.set(user_name, user_id)
+    return rows
 
-    resp = supabase.table("destinations").select("*").eq("user_id", user_id).execute()
-    if resp.data:
-        return {"Success": True, "Data": resp.data}
-    return {"Success": False, "Message": "No destinations found"}
+def _read_destinations(user_name: str, limit, after, columns: str):
+    # One backend call either way: a plain select when the user_id is cached,
+    # otherwise a users/destinations join that also tells us whether the user exists.
+    user_id = user_id_cache.get(user_name)
+    if user_id is not None:
+        rows = backend.select("destinations", {"user_id": user_id}, columns=columns, order_by="destination_id",
+                              limit=_fetch_size(limit), after=after)
+    else:
+        joined = backend.select_user_destinations(user_name, _fetch_size(limit), after, columns)
+        rows = _joined_rows(user_name, joined)
+        if rows is None:
+            return {"Success": False, "Message": "User not found"}
+    return _paged_result(rows, limit, after, "destination_id", "No destinations found")
 
 def update_destination_by_id(destination_id: int, destination_name=None, country_name=None, is_visited=None, notes=None):
-    updates = {}
-    if destination_name: updates["destination_name"] = destination_name
-    if country_name: updates["country_name"] = country_name
-    if is_visited is not None: updates["is_visited"] = is_visited
-    if notes: updates["notes"] = notes
+    updates = _destination_updates(destination_name, country_name, is_visited, notes)
     if not updates: return {"Success": False, "Message": "Nothing to update."}
-
-    resp = supabase.table("destinations").update(updates).eq("destination_id", destination_id).execute()
-    if resp.data:
-        return {"Success": True, "Data": resp.data[0]}
-    return {"Success": False, "Message": "Failed to update destination"}
+    if write_queue is not None:
+        return _queue_update(destination_id, updates)
+    rows = backend.update("destinations", updates, {"destination_id": destination_id})
+    _track_updates(rows)
+    return _first_row(rows, "Failed to update destination")
 
 def delete_destination_by_id(destination_id: int):
-    resp = supabase.table("destinations").delete().eq("destination_id", destination_id).execute()
-    if resp.data:
-        return {"Success": True, "Data": resp.data[0]}
-    return {"Success": False, "Message": "Failed to delete destination"}
\ No newline at end of file
+    if write_queue is not None:
+        return _queue_delete(destination_id)
+    rows = backend.delete("destinations", {"destination_id": destination_id})
+    _track_deletes(rows)
+    return _first_row(rows, "Failed to delete destination")
+
+def _changes_result(user_id, since: int, changed, tombstones):
+    # Rows another process wrote show up here first; don't keep serving stats without them
+    deleted = [tombstone["destination_id"] for tombstone in tombstones]
+    destination_counters.reconcile(user_id, changed, deleted)
+    versions = [row["version"] for row in changed if row.get("version") is not None]
+    versions += [tombstone["version"] for tombstone in tombstones]
+    return {"Success": True, "Data": {
+        "changed": changed,
+        "deleted": deleted,
+        "version": max(versions, default=since)
+    }}
+
+def get_destination_changes(user_name: str, since: int = 0):
+    """Destinations changed and deleted after version `since`; pass back the returned version next time."""
+    user_id, error = _read_user(user_name)
+    if error: return error
+    changed, tombstones = backend.select_changes(user_id, since)
+    return _changes_result(user_id, since, changed, tombstones)
+
+# ---------------- SEARCH ----------------
+
+# Index candidates fetched per requested result; src/search.py re-ranks them
+SEARCH_CANDIDATES = 5
+
+def _search_result(candidates, terms, limit):
+    rows = rank(candidates, terms, limit)
+    if not rows:
+        return {"Success": False, "Message": "No matching destinations"}
+    return {"Success": True, "Data": rows}
+
+def search_destinations(user_name: str, query: str, limit=20):
+    """Prefix and fuzzy search over name, country and notes, best matches first."""
+    terms = query_terms(query)
+    if not terms:
+        return {"Success": False, "Message": "Empty search query"}
+    user_id, error = _read_user(user_name)
+    if error: return error
+    candidates = backend.search_destinations(user_id, terms, limit * SEARCH_CANDIDATES)
+    return _search_result(candidates, terms, limit)
+
+# ---------------- STATISTICS ----------------
+
+def _stats_from_counts(counts):
+    """Fold the groups from count_destinations into travel stats. Country keys are stored
+    at write time; only rows written before country_key existed get normalized here."""
+    total = visited = 0
+    country_counts = {}
+    for group in counts:
+        total += group["count"]
+        if group["is_visited"]:
+            visited += group["count"]
+        country = group.get("country_key") or normalize_country_name(group["country_name"])
+        if country:  # Only count non-empty country names
+            country_counts[country] = country_counts.get(country, 0) + group["count"]
+    return {
+        "total": total,
+        "visited": visited,
+        "countries": len(country_counts),
+        "percentage": (visited / total * 100) if total > 0 else 0,
+        "unique_countries": list(country_counts),
+        "country_counts": country_counts
+    }
+
+def _same_stats(a, b):
+    return (a["total"], a["visited"], a["country_counts"]) == (b["total"], b["visited"], b["country_counts"])
+
+def get_destination_stats(user_name: str):
+    user_id, error = _read_user(user_name)
+    if error: return error
+    stats = destination_counters.get(user_id)
+    if stats is None:
+        generation = destination_counters.generation(user_id)
+        rows = backend.select("destinations", {"user_id": user_id}, columns=COUNTER_COLUMNS)
+        stats = destination_counters.load(user_id, rows, generation)
+    return {"Success": True, "Data": stats}
+
+def _compare_counters(user_id, counts):
+    """(expected stats from count_destinations, current counters, whether they agree)."""
+    expected = _stats_from_counts(counts)
+    counters = destination_counters.get(user_id)
+    return expected, counters, counters is None or _same_stats(counters, expected)
+
+def _check_result(expected, counters, consistent: bool, repair: bool):
+    return {"Success": True, "Data": {"consistent": consistent, "repaired": not consistent and repair,
+                                      "expected": expected, "counters": counters}}
+
+def check_destination_counters(user_name: str, repair=True):
+    """Compare the in-process counters with a fresh aggregate from the database and,
+    if they drifted and repair is set, rebuild them from the source rows."""
+    user_id, error = _read_user(user_name)
+    if error: return error
+    expected, counters, consistent = _compare_counters(user_id, backend.count_destinations(user_id))
+    if not consistent and repair:
+        generation = destination_counters.generation(user_id)
+        rows = backend.select("destinations", {"user_id": user_id}, columns=COUNTER_COLUMNS)
+        destination_counters.load(user_id, rows, generation)
+    return _check_result(expected, counters, consistent, repair)
+
+# ---------------- BULK DESTINATIONS ----------------
+# Each bulk call validates items locally, sends everything valid to the backend in one
+# batched write and returns {"Success": all items ok, "Data": [one result per item]}.
+
+MAX_BULK_ITEMS = 1000
+
+def _check_bulk_size(items):
+    if len(items) > MAX_BULK_ITEMS:
+        return {"Success": False, "Message": f"At most {MAX_BULK_ITEMS} items per request."}
+    return None
+
+def _prepare_inserts(user_id, destinations: list):
+    results, pending = [], []
+    for item in destinations:
+        if not item.get("destination_name") or not item.get("country_name"):
+            results.append({"Success": False, "Message": "Destination name and country are required."})
+            continue
+        results.append(None)
+        pending.append((len(results) - 1, _new_destination(user_id, item["destination_name"], item["country_name"],
+                                                           item.get("is_visited", False), item.get("notes"))))
+    return results, pending
+
+def _prepare_updates(items: list):
+    # Successive updates to the same destination_id are merged into one row of the batch
+    results, pending, merged = [], [], {}
+    for item in items:
+        destination_id = item.get("destination_id")
+        updates = _destination_updates(item.get("destination_name"), item.get("country_name"),
+                                       item.get("is_visited"), item.get("notes"))
+        if destination_id is None or not updates:
+            results.append({"Success": False, "Message": "Nothing to update."})
+            continue
+        merged.setdefault(destination_id, {"destination_id": destination_id}).update(updates)
+        results.append(None)
+        pending.append((len(results) - 1, {"destination_id": destination_id}))
+    return results, pending, list(merged.values())
+
+def _prepare_deletes(destination_ids: list):
+    pending = [(index, {"destination_id": destination_id}) for index, destination_id in enumerate(destination_ids)]
+    return [None] * len(destination_ids), pending, list(dict.fromkeys(destination_ids))
+
+def _fill_results(results, pending, rows, message: str, key=None):
+    """Match returned rows to the open result slots, by position for inserts or by key otherwise."""
+    by_key = {row[key]: row for row in rows} if key else dict(enumerate(rows))
+    for n, (index, item) in enumerate(pending):
+        row = by_key.get(item[key] if key else n)
+        results[index] = {"Success": True, "Data": row} if row else {"Success": False, "Message": message}
+    return {"Success": all(res["Success"] for res in results), "Data": results}
+
+def insert_destinations(user_name: str, destinations: list):
+    too_many = _check_bulk_size(destinations)
+    if too_many: return too_many
+    flush_writes()  # queued single writes go out before this batch
+    user_id = _get_user_id(user_name)
+    if user_id is None:
+        return {"Success": False, "Message": "User not found"}
+
+    results, pending = _prepare_inserts(user_id, destinations)
+    rows = backend.insert_many("destinations", [row for _, row in pending]) if pending else []
+    _track_inserts(rows)
+    return _fill_results(results, pending, rows, "Failed to add destination")
+
+def update_destinations(items: list):
+    too_many = _check_bulk_size(items)
+    if too_many: return too_many
+    flush_writes()
+    results, pending, batch = _prepare_updates(items)
+    rows = backend.update_many("destinations", "destination_id", batch) if batch else []
+    _track_updates(rows)
+    return _fill_results(results, pending, rows, "Failed to update destination", key="destination_id")
+
+def delete_destinations(destination_ids: list):
+    too_many = _check_bulk_size(destination_ids)
+    if too_many: return too_many
+    flush_writes()
+    results, pending, unique_ids = _prepare_deletes(destination_ids)
+    rows = backend.delete_many("destinations", "destination_id", unique_ids) if unique_ids else []
+    _track_deletes(rows)
+    return _fill_results(results, pending, rows, "Failed to delete destination", key="destination_id")
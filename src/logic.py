@@ -21,10 +21,10 @@ class TravelDairy:
         else:
             return {"Success": False, "Message": res.get("Message", "Authentication failed.")}
 
-    def get_users(self):
-        res = get_all_users()
+    def get_users(self, limit=None, after=None):
+        res = get_all_users(limit, after)
         if res.get("Success"):
-            return {"Success": True, "Data": res["Data"]}
+            return {"Success": True, "Data": res["Data"], "NextCursor": res.get("NextCursor")}
         else:
             return {"Success": False, "Message": res.get("Message", "No users found.")}
 
@@ -52,27 +52,48 @@ class Destination:
     def add_destination(self, user_name: str, destination_name: str, country_name: str, is_visited=False, notes=None):
         res = insert_destination(user_name, destination_name, country_name, is_visited, notes)
         if res.get("Success"):
-            return {"Success": True, "Data": res["Data"], "Message": "Destination added successfully!"}
+            return {"Success": True, "Data": res["Data"], "Queued": res.get("Queued", False), "Message": "Destination added successfully!"}
         else:
             return {"Success": False, "Message": res.get("Message", "Failed to add destination.")}
 
-    def get_all_destinations(self, user_name: str):
-        res = get_destinations_by_user_name(user_name)
+    def get_all_destinations(self, user_name: str, limit=None, after=None):
+        res = get_destinations_by_user_name(user_name, limit, after)
         if res.get("Success"):
-            return {"Success": True, "Data": res.get("Data")}
+            return {"Success": True, "Data": res.get("Data"), "NextCursor": res.get("NextCursor")}
         else:
             return {"Success": False, "Message": res.get("Message", "No destinations found.")}
 
+    def get_changes(self, user_name: str, since: int = 0):
+        res = get_destination_changes(user_name, since)
+        if res.get("Success"):
+            return {"Success": True, "Data": res["Data"]}
+        else:
+            return {"Success": False, "Message": res.get("Message", "Failed to sync destinations.")}
+
+    def search(self, user_name: str, query: str, limit: int = 20):
+        res = search_destinations(user_name, query, limit)
+        if res.get("Success"):
+            return {"Success": True, "Data": res["Data"]}
+        else:
+            return {"Success": False, "Message": res.get("Message", "No matching destinations.")}
+
+    def get_stats(self, user_name: str):
+        res = get_destination_stats(user_name)
+        if res.get("Success"):
+            return {"Success": True, "Data": res["Data"]}
+        else:
+            return {"Success": False, "Message": res.get("Message", "Failed to load statistics.")}
+
     def update_destination(self, destination_id: int, destination_name=None, country_name=None, is_visited=None, notes=None):
         res = update_destination_by_id(destination_id, destination_name, country_name, is_visited, notes)
         if res.get("Success"):
-            return {"Success": True, "Data": res["Data"], "Message": "Destination updated successfully!"}
+            return {"Success": True, "Data": res["Data"], "Queued": res.get("Queued", False), "Message": "Destination updated successfully!"}
         else:
             return {"Success": False, "Message": res.get("Message", "Failed to update destination.")}
 
     def delete_destination(self, destination_id: int):
         res = delete_destination_by_id(destination_id)
         if res.get("Success"):
-            return {"Success": True, "Data": res["Data"], "Message": "Destination deleted successfully!"}
+            return {"Success": True, "Data": res["Data"], "Queued": res.get("Queued", False), "Message": "Destination deleted successfully!"}
         else:
             return {"Success": False, "Message": res.get("Message", "Failed to delete destination.")}
\ No newline at end of file
@@ -0,0 +1,146 @@
+# src/resilience.py
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from src.metrics import Counter, Gauge, registry
+
+# Backend calls that only read, so retrying or hedging them cannot write anything twice
+READ_OPERATIONS = {"select", "select_user_destinations", "count_destinations", "select_changes", "select_version",
+                   "search_destinations"}
+
+RESILIENCE_EVENTS = registry.register(Counter(
+    "travel_diary_backend_resilience_events_total",
+    "Backend calls that timed out, were retried, hedged, or rejected by the open circuit, by operation.",
+    ["operation", "event"],
+))
+
+class BackendUnavailable(Exception):
+    """The backend is failing or too slow to answer; the API turns this into a 503."""
+
+    retry_after = 1.0
+
+class BackendTimeout(BackendUnavailable, TimeoutError):
+    pass
+
+class BackendBusy(BackendUnavailable):
+    """No backend thread was free to make the call in time. This process is saturated; it
+    says nothing about the backend, so it does not count against the circuit."""
+
+class CircuitOpenError(BackendUnavailable):
+    def __init__(self, retry_after: float):
+        super().__init__("Backend circuit is open")
+        self.retry_after = retry_after
+
+def is_transient(exc: Exception):
+    """Errors that say the backend is unreachable or overloaded, as opposed to an answer
+    like a unique violation. Only these are retried and count against the circuit."""
+    if isinstance(exc, (TimeoutError, ConnectionError, sqlite3.OperationalError)):
+        return True
+    # httpx (under the supabase client) transport errors: connect/read timeouts, resets
+    return type(exc).__module__.split(".")[0] in ("httpx", "httpcore")
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` transient failures in a row and rejects calls for
+    `reset_timeout` seconds. Then one trial call is let through: success closes the circuit,
+    failure opens it again. A threshold of 0 never opens. Thread safe."""
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go to the backend now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            waited = time.monotonic() - self._opened_at
+            if self.state == self.OPEN and waited >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return
+            raise CircuitOpenError(max(self.reset_timeout - waited, 1.0))
+
+    def success(self):
+        with self._lock:
+            self.state, self.failures, self._trial = self.CLOSED, 0, False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.state == self.HALF_OPEN or (self.failure_threshold and self.failures >= self.failure_threshold):
+                self.state, self._opened_at = self.OPEN, time.monotonic()
+
+    def abandon(self):
+        """The call was cancelled before the backend answered: no verdict, let another try."""
+        with self._lock:
+            self._trial = False
+
+class ResiliencePolicy:
+    """Timeouts, retries, hedging and the circuit breaker shared by the sync and async
+    backend wrappers. A timeout of None waits forever; hedge_after None never hedges."""
+
+    def __init__(self, read_timeout=10.0, write_timeout=30.0, retries=2, backoff=0.05,
+                 hedge_after=None, breaker: CircuitBreaker = None):
+        self.read_timeout = read_timeout
+        self.write_timeout = write_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+
+    def timeout(self, method: str):
+        return self.read_timeout if method in READ_OPERATIONS else self.write_timeout
+
+    def attempts(self, method: str):
+        return 1 + self.retries if method in READ_OPERATIONS else 1
+
+    def hedge_delay(self, method: str, args):
+        """Hedge only the reads behind get_destinations_by_user_name."""
+        if method == "select_user_destinations" or (method == "select" and args[0] == "destinations"):
+            return self.hedge_after
+        return None
+
+    def backoff_delay(self, attempt: int):
+        # Full jitter, so clients retrying the same outage spread out
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+def _seconds(name: str, default: str):
+    value = float(os.getenv(name, default))
+    return value if value > 0 else None
+
+def policy_from_env():
+    """BACKEND_READ_TIMEOUT / BACKEND_WRITE_TIMEOUT (seconds, 0 = none), BACKEND_READ_RETRIES,
+    BACKEND_RETRY_BACKOFF, BACKEND_HEDGE_AFTER (seconds, 0 = off), BACKEND_BREAKER_FAILURES
+    (0 = never open) and BACKEND_BREAKER_RESET (seconds)."""
+    breaker = CircuitBreaker(int(os.getenv("BACKEND_BREAKER_FAILURES", "5")),
+                             float(os.getenv("BACKEND_BREAKER_RESET", "10")))
+    return ResiliencePolicy(
+        read_timeout=_seconds("BACKEND_READ_TIMEOUT", "10"),
+        write_timeout=_seconds("BACKEND_WRITE_TIMEOUT", "30"),
+        retries=int(os.getenv("BACKEND_READ_RETRIES", "2")),
+        backoff=float(os.getenv("BACKEND_RETRY_BACKOFF", "0.05")),
+        hedge_after=_seconds("BACKEND_HEDGE_AFTER", "0"),
+        breaker=breaker,
+    )
+
+CIRCUIT_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+def circuit_state_gauge(get_breaker):
+    """Gauge of the circuit state: 0 closed, 1 half-open (trial call), 2 open."""
+    return registry.register(Gauge(
+        "travel_diary_backend_circuit_state",
+        "Backend circuit breaker state: 0 closed, 1 half-open, 2 open.",
+        function=lambda: {(): CIRCUIT_STATES[get_breaker().state]},
+    ))
@@ -0,0 +1,63 @@
+# src/search.py
+import re
+import unicodedata
+
+# (column, weight): a hit in the name counts for more than one buried in the notes
+SEARCH_FIELDS = [("destination_name", 3.0), ("country_name", 2.0), ("notes", 1.0)]
+
+# Minimum trigram similarity for a typo-tolerant word match (pg_trgm's default threshold)
+FUZZY_THRESHOLD = 0.3
+
+def fold(text: str):
+    """Lowercase and strip accents, so 'São' and 'sao' index and match alike."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+def _words(text):
+    return re.findall(r"\w+", fold(text or ""))
+
+def query_terms(query: str):
+    """Lowercased, accent-free words of a search query."""
+    return _words(query)
+
+def trigrams(word: str):
+    """pg_trgm-style trigrams: the word padded with two spaces in front and one behind."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def similarity(a: str, b: str):
+    ta, tb = trigrams(a), trigrams(b)
+    return len(ta & tb) / len(ta | tb)
+
+def _term_score(term: str, words):
+    """1 for an exact word, then prefix, substring and finally fuzzy matches."""
+    best = 0.0
+    for word in words:
+        if word == term:
+            return 1.0
+        if word.startswith(term):
+            best = max(best, 0.8)
+        elif term in word:
+            best = max(best, 0.6)
+        else:
+            score = similarity(term, word)
+            if score >= FUZZY_THRESHOLD:
+                best = max(best, 0.5 * score)
+    return best
+
+def score(row, terms):
+    """Weighted relevance of a destination row; 0 unless every term matches some field."""
+    fields = [(_words(row.get(column)), weight) for column, weight in SEARCH_FIELDS]
+    total = 0.0
+    for term in terms:
+        best = max(weight * _term_score(term, words) for words, weight in fields)
+        if not best:
+            return 0.0
+        total += best
+    return total / len(terms)
+
+def rank(rows, terms, limit: int):
+    """Score the backend's candidate rows and return the best `limit`, each with its `score`."""
+    scored = [(score(row, terms), row) for row in rows]
+    hits = sorted((pair for pair in scored if pair[0] > 0), key=lambda pair: (-pair[0], pair[1]["destination_id"]))
+    return [{**row, "score": round(value, 3)} for value, row in hits[:limit]]
@@ -0,0 +1,79 @@
+# src/singleflight.py
+import asyncio
+import threading
+
+from src.metrics import Counter, registry
+
+FLIGHTS = registry.register(Counter(
+    "travel_diary_singleflight_calls_total",
+    "Data-layer calls by operation: role=leader ran the backend call, role=shared waited for "
+    "an identical call already in flight and reused its result.",
+    ["operation", "role"],
+))
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key: the first caller runs the function,
+    the others block until it returns and share its result (or its exception).
+
+    Results are shared objects, so callers must treat them as read-only.
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            FLIGHTS.inc(operation=self.operation, role="shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        FLIGHTS.inc(operation=self.operation, role="leader")
+        try:
+            call.result = fn(*args)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+def _retrieve(task):
+    # Mark a failure as seen even if every caller was cancelled before it finished
+    if not task.cancelled():
+        task.exception()
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines. The call runs as its own task, so a caller that is
+    cancelled (e.g. the client went away) does not cancel it for the others."""
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self._calls = {}
+
+    async def do(self, key, fn, *args):
+        task = self._calls.get(key)
+        if task is None:
+            FLIGHTS.inc(operation=self.operation, role="leader")
+            task = self._calls[key] = asyncio.ensure_future(fn(*args))
+            task.add_done_callback(lambda done: self._calls.pop(key, None))
+            task.add_done_callback(_retrieve)
+        else:
+            FLIGHTS.inc(operation=self.operation, role="shared")
+        return await asyncio.shield(task)
@@ -0,0 +1,35 @@
+# src/versions.py
+import itertools
+import secrets
+
+from src.cache import TTLCache
+
+class DataVersions:
+    """Opaque per-user tags that change on every destination write made by this process.
+
+    The single-flight destination reads in src/db.py key on them, so a read that starts
+    after a write never shares a call that started before it. Writes by other processes do
+    not move them, so they are never handed to clients: ETags come from the stored version
+    (Backend.select_version) instead.
+    """
+
+    def __init__(self, maxsize=1024, ttl=30.0):
+        self._tags = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Tags from another process or an earlier run never collide with ours
+        self._epoch = secrets.token_hex(4)
+        self._seq = itertools.count(1)
+
+    def current(self, user_id):
+        """The user's tag, issuing a fresh one if there is none yet."""
+        tag = self._tags.get(user_id)
+        if tag is None:
+            tag = f"{self._epoch}-{next(self._seq)}"
+            self._tags.set(user_id, tag)
+        return tag
+
+    def bump(self, user_id):
+        """Retire the user's tag after a write; the next read gets a new one."""
+        self._tags.invalidate(user_id)
+
+    def clear(self):
+        self._tags.clear()
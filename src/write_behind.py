@@ -0,0 +1,240 @@
+# src/write_behind.py
+import logging
+import threading
+import time
+
+from src.metrics import Counter, Gauge, Histogram, registry
+
+FLUSH_LATENCY = registry.register(Histogram(
+    "travel_diary_write_behind_flush_duration_seconds",
+    "Time to write one batch of queued destination mutations, by what triggered the flush.",
+    ["trigger"],
+))
+
+FLUSHED = registry.register(Counter(
+    "travel_diary_write_behind_mutations_total",
+    "Queued destination mutations written by the flusher, by operation and outcome "
+    "(ok, failed: the row was gone, retry: requeued after an error, error: given up on).",
+    ["operation", "outcome"],
+))
+
+class PendingWrites:
+    """Destination mutations waiting to be written, already coalesced:
+    inserts in order, one merged update per destination_id, deletes by destination_id.
+    `attempts` counts the failed background flushes of a requeued batch."""
+
+    def __init__(self):
+        self.inserts = []
+        self.updates = {}
+        self.deletes = {}
+        self.attempts = 0
+
+    def __len__(self):
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+    def merge(self, newer):
+        """This batch with `newer` (queued while it was being written) applied on top."""
+        merged = PendingWrites()
+        merged.attempts = self.attempts
+        merged.inserts = self.inserts + newer.inserts
+        merged.updates = {destination_id: dict(updates) for destination_id, updates in self.updates.items()
+                          if destination_id not in newer.deletes}
+        for destination_id, updates in newer.updates.items():
+            if destination_id not in self.deletes:  # an update after the delete would find no row
+                merged.updates.setdefault(destination_id, {"destination_id": destination_id}).update(updates)
+        merged.deletes = {**self.deletes, **newer.deletes}
+        return merged
+
+class WriteBehindQueue:
+    """Buffers destination inserts, updates and deletes and hands them to `write` in batches.
+
+    A background thread flushes the queue `window` seconds after the first queued mutation,
+    or as soon as `max_batch` are waiting. Readers call flush() first, which also waits for
+    a flush already in progress, so a read always sees every write queued before it.
+
+    `write` clears each part of the batch (inserts, updates, deletes) once it is written. If
+    it raises, whatever is left goes back to the front of the queue and the background thread
+    retries it after `retry_delay` seconds, doubling each time. After `max_attempts` failed
+    background flushes the mutations are dropped and counted per user for take_lost(). Inserts
+    carry their user_id; for updates and deletes the next flush asks `owners`, which maps
+    destination_ids to the user_id of those rows that still exist.
+    """
+
+    def __init__(self, write, owners, window=0.05, max_batch=100, max_attempts=5, retry_delay=1.0):
+        self.write = write
+        self.owners = owners
+        self.window = window
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._pending = PendingWrites()
+        self._first_queued = None
+        # Set while a failed batch waits to be retried
+        self._retry_at = None
+        # Given-up mutations by user_id, and the destination_ids whose owner is not known yet
+        self._lost = {}
+        self._unowned = set()
+        self._cond = threading.Condition()
+        # Held while a batch is on its way to the backend; serializes flushes
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._thread = None
+
+    # ---- queueing ----
+
+    def _queued(self):
+        # Caller holds self._cond
+        if self._first_queued is None:
+            self._first_queued = time.monotonic()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+        if len(self._pending) >= self.max_batch:
+            self._cond.notify()
+
+    def insert(self, row: dict):
+        with self._cond:
+            self._pending.inserts.append(row)
+            self._queued()
+
+    def update(self, destination_id, updates: dict):
+        """Queue an update, merged into any update already waiting for destination_id.
+        Returns False if a delete of that destination is already queued."""
+        with self._cond:
+            if destination_id in self._pending.deletes:
+                return False
+            self._pending.updates.setdefault(destination_id, {"destination_id": destination_id}).update(updates)
+            self._queued()
+            return True
+
+    def delete(self, destination_id):
+        with self._cond:
+            self._pending.updates.pop(destination_id, None)
+            self._pending.deletes[destination_id] = None
+            self._queued()
+
+    def depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def idle(self):
+        """True when nothing is queued, being written or waiting to be attributed to its
+        user, so a read can skip flush()."""
+        return not len(self._pending) and not self._unowned and not self._flush_lock.locked()
+
+    def take_lost(self, user_id):
+        """user_id's mutations given up on since the last call, so its reader can be told."""
+        with self._cond:
+            return self._lost.pop(user_id, 0)
+
+    # ---- flushing ----
+
+    def flush(self, trigger="read"):
+        """Write everything queued so far and return once it is in the backend. If the write
+        fails, the batch is requeued (see _failed) and the error is raised to the caller."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending, self._first_queued = self._pending, PendingWrites(), None
+            if not batch:
+                self._find_owners()
+                return
+            started = time.perf_counter()
+            try:
+                self.write(batch)
+                with self._cond:
+                    self._retry_at = None
+            except Exception:
+                self._failed(batch, trigger)
+                raise
+            finally:
+                FLUSH_LATENCY.observe(time.perf_counter() - started, trigger=trigger)
+            self._find_owners()
+
+    def _find_owners(self):
+        """Charge given-up updates and deletes to their users. Caller holds self._flush_lock
+        and the backend has just answered. A destination that is gone changed nothing."""
+        with self._cond:
+            unowned, self._unowned = self._unowned, set()
+        if not unowned:
+            return
+        try:
+            owners = self.owners(sorted(unowned))
+        except Exception:
+            with self._cond:
+                self._unowned |= unowned
+            raise
+        with self._cond:
+            for user_id in owners.values():
+                self._lost[user_id] = self._lost.get(user_id, 0) + 1
+
+    def _failed(self, batch, trigger):
+        """Put what is left of a failed batch back ahead of anything queued meanwhile. Only
+        background flushes count as attempts; a reader's flush failing just raises to it."""
+        log = logging.getLogger("travel_diary")
+        if trigger != "read":
+            batch.attempts += 1
+        if batch.attempts >= self.max_attempts or self._closed:
+            # Already acknowledged to the callers: report it, and tell each user's next read
+            log.exception("Write-behind gave up on %d mutations after %d attempts", len(batch), batch.attempts)
+            FLUSHED.inc(len(batch), operation="batch", outcome="error")
+            with self._cond:
+                for row in batch.inserts:
+                    self._lost[row["user_id"]] = self._lost.get(row["user_id"], 0) + 1
+                self._unowned.update(batch.updates, batch.deletes)
+            return
+        log.warning("Write-behind flush of %d mutations failed, will retry", len(batch), exc_info=True)
+        FLUSHED.inc(len(batch), operation="batch", outcome="retry")
+        with self._cond:
+            self._pending = batch.merge(self._pending)
+            self._first_queued = self._first_queued or time.monotonic()
+            self._retry_at = time.monotonic() + self.retry_delay * 2 ** max(batch.attempts - 1, 0)
+
+    def _due(self):
+        # Caller holds self._cond
+        if self._retry_at is not None:
+            return self._retry_at
+        return self._first_queued + self.window
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not len(self._pending) and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # Wait out the window unless the batch fills up (or a reader drains it) first;
+                # a batch waiting to be retried waits out its backoff regardless of size
+                while len(self._pending) and (len(self._pending) < self.max_batch or self._retry_at is not None):
+                    remaining = self._due() - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._retry_at is not None:
+                    trigger = "retry"
+                else:
+                    trigger = "size" if len(self._pending) >= self.max_batch else "window"
+            try:
+                self.flush(trigger)
+            except Exception:
+                pass  # logged and requeued by _failed
+
+    def close(self):
+        """Write what is left and stop the background thread. Anything that still fails is dropped."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        try:
+            self.flush("close")
+        except Exception:
+            pass  # logged and counted as lost by _failed
+
+def queue_depth_gauge(get_queue):
+    """Gauge reading the depth of whatever queue get_queue() returns (None when write-behind is off)."""
+    def depth():
+        queue = get_queue()
+        return {(): queue.depth() if queue is not None else 0}
+    return registry.register(Gauge(
+        "travel_diary_write_behind_queue_depth",
+        "Destination mutations queued and not yet written to the backend.",
+        function=depth,
+    ))
@@ -0,0 +1,24 @@
+# tests/conftest.py
+# The data layer picks its backend at import time; tests run on throwaway SQLite databases.
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("DB_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", ":memory:")
+os.environ.setdefault("WRITE_BEHIND_WINDOW", "0")
+
+import pytest
+
+from src import async_db, db
+from src.backends import SQLiteBackend
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    """A database file this process uses through src.db and src.async_db; open it again to
+    play another process."""
+    path = str(tmp_path / "travel_diary.db")
+    async_db.set_backend(SQLiteBackend(path))
+    yield path
+    db.configure_write_behind(0)
+    async_db.set_backend(SQLiteBackend(":memory:"))
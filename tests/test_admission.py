@@ -0,0 +1,48 @@
+# tests/test_admission.py
+import asyncio
+
+import httpx
+
+from API import main
+from src.admission import AdmissionController
+from src.metrics import registry
+
+async def _statuses(client_host: str, path: str, count: int):
+    transport = httpx.ASGITransport(app=main.app, client=(client_host, 50000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return [(await client.get(path)).status_code for _ in range(count)]
+
+def test_admission_is_off_by_default():
+    assert main.admission.concurrency == 0 and main.admission.buckets is None
+    assert main.admission.limiter("/destinations/{user_name}") is None
+
+def test_rate_limit_is_per_caller_not_per_user_in_the_path(sqlite_path, monkeypatch):
+    monkeypatch.setattr(main, "admission", AdmissionController(0, 0, 1.0, rate=0.01, burst=3))
+    # One client spamming someone else's listing uses up its own tokens only
+    assert asyncio.run(_statuses("10.0.0.1", "/destinations/victim", 5))[-2:] == [429, 429]
+    assert 429 not in asyncio.run(_statuses("10.0.0.2", "/destinations/victim", 3))
+
+def test_streamed_export_holds_its_slot_until_the_last_page(monkeypatch):
+    route = "/destinations/{user_name}/export"
+    controller = AdmissionController(0, 0, 1.0, route_limits={route: 1})
+    monkeypatch.setattr(main, "admission", controller)
+    active = []
+
+    async def get_destinations_by_user_name(user_name, limit=None, after=None, fields=None):
+        active.append(controller.limiter(route).active)
+        if after is None:
+            return {"Success": True, "Data": [{"destination_id": 1}], "NextCursor": 1}
+        return {"Success": True, "Data": [{"destination_id": 2}], "NextCursor": None}
+
+    monkeypatch.setattr(main.db, "get_destinations_by_user_name", get_destinations_by_user_name)
+    assert asyncio.run(_statuses("10.0.0.1", "/destinations/ana/export", 1)) == [200]
+    assert active == [1, 1]  # the second page is read while the body streams
+    assert controller.limiter(route).active == 0
+
+def test_gauges_follow_the_current_controller_without_duplicates(monkeypatch):
+    controller = AdmissionController(2, 0, 1.0)
+    monkeypatch.setattr(main, "admission", controller)
+    asyncio.run(controller.limiter("/signin").acquire())
+    metrics = registry.render()
+    assert metrics.count("# TYPE travel_diary_admission_in_flight gauge") == 1
+    assert 'travel_diary_admission_in_flight{route="/signin"} 1' in metrics
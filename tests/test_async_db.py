@@ -0,0 +1,50 @@
+# tests/test_async_db.py
+import asyncio
+import inspect
+
+import pytest
+
+from src import async_db, db
+from src.backends import SQLiteBackend
+
+# Configuration and diagnostics of the sync module that the API never calls
+SYNC_ONLY = {"configure_write_behind", "get_cache_stats"}
+
+@pytest.fixture
+def both(tmp_path):
+    async_db.set_backend(SQLiteBackend(str(tmp_path / "travel_diary.db")))
+    db.insert_user("ana@example.com", "ana", "secret")
+    db.insert_destinations("ana", [{"destination_name": f"Place {i}", "country_name": "France", "is_visited": i % 2 == 0}
+                                   for i in range(5)] + [{"destination_name": "Rome", "country_name": "Italy"}])
+    yield
+    async_db.set_backend(SQLiteBackend(":memory:"))
+
+def test_every_data_function_has_an_async_twin():
+    for name, function in vars(db).items():
+        if name.startswith("_") or name in SYNC_ONLY or getattr(function, "__module__", None) != db.__name__:
+            continue
+        twin = getattr(async_db, name)
+        assert inspect.signature(twin) == inspect.signature(function), name
+
+@pytest.mark.parametrize("name, args", [
+    ("get_destinations_by_user_name", ("ana", 2)),
+    ("get_destinations_by_user_name", ("ana", 2, 2, "destination_name")),
+    ("get_destinations_by_user_name", ("ana", None, None, "password")),
+    ("get_destinations_by_user_name", ("nobody",)),
+    ("get_destination_changes", ("ana", 3)),
+    ("search_destinations", ("ana", "rome")),
+    ("get_destination_stats", ("ana",)),
+    ("check_destination_counters", ("ana",)),
+    ("authenticate_user", ("ana", "wrong")),
+    ("get_all_users", (1,)),
+    ("get_data_version", ("ana",)),
+])
+def test_async_twins_answer_like_the_sync_functions(both, name, args):
+    assert asyncio.run(getattr(async_db, name)(*args)) == getattr(db, name)(*args)
+
+def test_data_version_moves_with_writes_from_another_process(both, tmp_path):
+    version = db.get_data_version("ana")
+    other = SQLiteBackend(str(tmp_path / "travel_diary.db"))
+    user_id = other.select("users", {"user_name": "ana"})[0]["user_id"]
+    other.insert("destinations", {"user_id": user_id, "destination_name": "Oslo", "country_name": "Norway"})
+    assert asyncio.run(async_db.get_data_version("ana")) > version
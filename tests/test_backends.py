@@ -0,0 +1,113 @@
+# tests/test_backends.py
+import asyncio
+
+from benchmarks.fake_supabase import AsyncFakeClient, FakeClient, FakeDatabase
+from src.backends import (BACKEND_METHODS, AsyncForwardingBackend, ForwardingBackend, SQLiteBackend,
+                          SupabaseBackend, TimedBackend, create_async_backend)
+from src.metrics import BACKEND_LATENCY
+
+def _backend_with_user():
+    backend = SQLiteBackend(":memory:")
+    user_id = backend.insert("users", {"user_email": "ana@example.com", "user_name": "ana"})[0]["user_id"]
+    return backend, user_id
+
+def _stored_versions(backend):
+    return {row["destination_id"]: row["version"] for row in backend.select("destinations")}
+
+def test_sqlite_writes_return_the_stored_version():
+    backend, user_id = _backend_with_user()
+    inserted = backend.insert("destinations", {"user_id": user_id, "destination_name": "Rome", "country_name": "Italy"})
+    inserted += backend.insert_many("destinations", [{"user_id": user_id, "destination_name": f"Place {i}",
+                                                      "country_name": "France"} for i in range(2)])
+    assert {row["destination_id"]: row["version"] for row in inserted} == _stored_versions(backend)
+    assert None not in _stored_versions(backend).values()
+
+    updated = backend.update("destinations", {"notes": "pasta"}, {"destination_id": inserted[0]["destination_id"]})
+    updated += backend.update_many("destinations", "destination_id",
+                                   [{"destination_id": row["destination_id"], "is_visited": True} for row in inserted[1:]])
+    stored = _stored_versions(backend)
+    assert all(row["version"] == stored[row["destination_id"]] for row in updated)
+    assert min(row["version"] for row in updated) > max(row["version"] for row in inserted)
+
+def test_short_queries_match_folded_text_like_the_index():
+    backend, user_id = _backend_with_user()
+    backend.insert_many("destinations", [
+        {"user_id": user_id, "destination_name": "São Paulo", "country_name": "Brazil"},
+        {"user_id": user_id, "destination_name": "Oslo", "country_name": "Norway"},
+    ])
+    names = lambda terms: [row["destination_name"] for row in backend.search_destinations(user_id, terms, 10)]
+    assert names(["sao"]) == ["São Paulo"]  # trigram index
+    assert names(["sa"]) == ["São Paulo"]  # short-term scan
+    assert names(["xx", "pa"]) == ["São Paulo"]  # any term makes a candidate
+
+def test_wrappers_forward_every_interface_method():
+    for wrapper in (ForwardingBackend, AsyncForwardingBackend):
+        assert all(method in vars(wrapper) for method in BACKEND_METHODS)
+    timed = TimedBackend(_backend_with_user()[0])
+    before = _user_selects()
+    # Keyword arguments reach _call as positional ones, so the table is always args[0]
+    assert timed.select("users", columns="user_name", limit=1) == [{"user_name": "ana"}]
+    assert _user_selects() == before + 1
+
+def _user_selects():
+    return sum(value for name, labels, value in BACKEND_LATENCY.samples()
+               if name.endswith("_count") and 'table="users",operation="select"' in labels)
+
+class RecordingClient(FakeClient):
+    """FakeClient that keeps every query it builds."""
+
+    def __init__(self, database):
+        super().__init__(database)
+        self.queries = []
+
+    def table(self, name: str):
+        query = super().table(name)
+        self.queries.append(query)
+        return query
+
+def test_supabase_bulk_update_sends_only_the_changes():
+    client = RecordingClient(FakeDatabase())
+    backend = SupabaseBackend("fake", "fake", client=client)
+    user_id = backend.insert("users", {"user_email": "ana@example.com", "user_name": "ana"})[0]["user_id"]
+    ids = [row["destination_id"] for row in backend.insert_many("destinations", [
+        {"user_id": user_id, "destination_name": f"Place {i}", "country_name": "France"} for i in range(3)])]
+    backend.delete("destinations", {"destination_id": ids[2]})
+    client.queries.clear()
+
+    rows = backend.update_many("destinations", "destination_id", [
+        {"destination_id": ids[0], "is_visited": True}, {"destination_id": ids[1], "is_visited": True},
+        {"destination_id": ids[2], "is_visited": True}, {"destination_id": ids[1], "notes": "pasta"}])
+    # Identical changes share an UPDATE; nothing is read back and upserted
+    assert [(query.action, query.payload) for query in client.queries] == [("update", {"is_visited": True}),
+                                                                         ("update", {"notes": "pasta"})]
+    assert sorted(row["destination_id"] for row in rows) == [ids[0], ids[1], ids[1]]
+    assert [row["destination_id"] for row in backend.select("destinations")] == ids[:2]  # not re-created
+
+def test_async_supabase_bulk_update_matches_the_sync_one():
+    database = FakeDatabase()
+    backend = SupabaseBackend("fake", "fake", client=FakeClient(database), async_client=AsyncFakeClient(database))
+    user_id = backend.insert("users", {"user_email": "ana@example.com", "user_name": "ana"})[0]["user_id"]
+    ids = [row["destination_id"] for row in backend.insert_many("destinations", [
+        {"user_id": user_id, "destination_name": f"Place {i}", "country_name": "France"} for i in range(3)])]
+    rows = asyncio.run(create_async_backend(backend).update_many("destinations", "destination_id", [
+        {"destination_id": ids[0], "is_visited": True}, {"destination_id": ids[2], "notes": "pasta"}]))
+    assert {row["destination_id"]: (row["is_visited"], row["notes"]) for row in rows} == {ids[0]: (True, None),
+                                                                                         ids[2]: (False, "pasta")}
+
+def test_stored_version_moves_on_every_write_of_the_user():
+    database = FakeDatabase()
+    for backend in (SQLiteBackend(":memory:"), SupabaseBackend("fake", "fake", client=FakeClient(database),
+                                                               async_client=AsyncFakeClient(database))):
+        ana, bob = (backend.insert("users", {"user_email": f"{name}@example.com", "user_name": name})[0]["user_id"]
+                    for name in ("ana", "bob"))
+        assert backend.select_version(ana) == 0
+        row = backend.insert("destinations", {"user_id": ana, "destination_name": "Rome", "country_name": "Italy"})[0]
+        inserted = backend.select_version(ana)
+        assert inserted == row["version"]
+
+        backend.insert("destinations", {"user_id": bob, "destination_name": "Oslo", "country_name": "Norway"})
+        assert backend.select_version(ana) == inserted  # another user's write
+        backend.delete("destinations", {"destination_id": row["destination_id"]})
+        deleted = backend.select_version(ana)
+        assert deleted > inserted  # the tombstone carries it
+        assert asyncio.run(create_async_backend(backend).select_version(ana)) == deleted
@@ -0,0 +1,77 @@
+# tests/test_counters.py
+import time
+
+from src import db
+from src.backends import SQLiteBackend
+from src.counters import DestinationCounters
+
+def _seed(user_name="ana", count=30):
+    db.insert_user(f"{user_name}@example.com", user_name, "secret")
+    db.insert_destinations(user_name, [{"destination_name": f"Place {i}", "country_name": "France"}
+                                       for i in range(count)])
+
+def _write_elsewhere(path, user_name, rows):
+    """Write the way another process (the Streamlit app, a second API worker) would."""
+    other = SQLiteBackend(path)
+    user_id = other.select("users", {"user_name": user_name}, columns="user_id")[0]["user_id"]
+    return other.insert_many("destinations", [{"user_id": user_id, **row} for row in rows])
+
+def test_writes_in_this_process_keep_counters_current(sqlite_path):
+    _seed()
+    assert db.get_destination_stats("ana")["Data"]["total"] == 30
+    db.insert_destination("ana", "Rome", "Italy", is_visited=True)
+    stats = db.get_destination_stats("ana")["Data"]
+    assert (stats["total"], stats["visited"], stats["countries"]) == (31, 1, 2)
+    # Our own writes come back from a delta sync unchanged, so the counters are kept
+    db.get_destination_changes("ana", 0)
+    assert db.destination_counters.get(db._get_user_id("ana")) is not None
+
+def test_delta_sync_drops_counters_after_another_process_writes(sqlite_path):
+    _seed()
+    assert db.get_destination_stats("ana")["Data"]["total"] == 30
+    version = db.get_destination_changes("ana", 0)["Data"]["version"]
+
+    _write_elsewhere(sqlite_path, "ana", [{"destination_name": "Oslo", "country_name": "Norway", "is_visited": True}])
+
+    changes = db.get_destination_changes("ana", version)["Data"]
+    assert [row["destination_name"] for row in changes["changed"]] == ["Oslo"]
+    stats = db.get_destination_stats("ana")["Data"]
+    assert (stats["total"], stats["visited"], stats["countries"]) == (31, 1, 2)
+
+def test_delta_sync_drops_counters_after_another_process_deletes(sqlite_path):
+    _seed(count=3)
+    assert db.get_destination_stats("ana")["Data"]["total"] == 3
+    version = db.get_destination_changes("ana", 0)["Data"]["version"]
+    SQLiteBackend(sqlite_path).delete("destinations", {"destination_name": "Place 0"})
+
+    assert len(db.get_destination_changes("ana", version)["Data"]["deleted"]) == 1
+    assert db.get_destination_stats("ana")["Data"]["total"] == 2
+
+def test_counters_expire_so_other_writers_show_up_without_a_sync(sqlite_path, monkeypatch):
+    monkeypatch.setattr(db, "destination_counters", DestinationCounters(ttl=0.05))
+    _seed()
+    assert db.get_destination_stats("ana")["Data"]["total"] == 30
+    _write_elsewhere(sqlite_path, "ana", [{"destination_name": "Oslo", "country_name": "Norway"}])
+    assert db.get_destination_stats("ana")["Data"]["total"] == 30  # still within the TTL
+    time.sleep(0.06)
+    assert db.get_destination_stats("ana")["Data"]["total"] == 31
+
+class WriteAfterSelect(SQLiteBackend):
+    """Lets a write of this process land right after the next counter rows select."""
+
+    write = None
+
+    def select(self, table, filters=None, columns="*", order_by=None, limit=None, after=None):
+        rows = super().select(table, filters, columns, order_by, limit, after)
+        if columns == db.COUNTER_COLUMNS and self.write:
+            write, self.write = self.write, None
+            write()
+        return rows
+
+def test_cold_load_keeps_no_counters_that_miss_a_racing_write(sqlite_path):
+    backend = WriteAfterSelect(sqlite_path)
+    db.set_backend(backend)
+    _seed()
+    backend.write = lambda: db.insert_destination("ana", "Rome", "Italy")
+    assert db.get_destination_stats("ana")["Data"]["total"] == 30  # read before the insert
+    assert db.get_destination_stats("ana")["Data"]["total"] == 31
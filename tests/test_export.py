@@ -0,0 +1,36 @@
+# tests/test_export.py
+import asyncio
+
+import httpx
+import pytest
+
+from API import main
+
+PAGES = [
+    {"Success": True, "Data": [{"destination_id": 1, "destination_name": "Rome"}], "NextCursor": 1},
+    {"Success": False, "Message": "1 queued destination change(s) could not be saved"},
+]
+
+def _export(monkeypatch, pages):
+    async def get_destinations_by_user_name(user_name, limit=None, after=None, fields=None):
+        return pages.pop(0)
+
+    async def fetch():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/destinations/ana/export")
+
+    monkeypatch.setattr(main.db, "get_destinations_by_user_name", get_destinations_by_user_name)
+    return asyncio.run(fetch())
+
+def test_failed_first_page_is_returned_as_the_error(monkeypatch):
+    res = _export(monkeypatch, PAGES[1:])
+    assert res.json() == PAGES[1]
+
+def test_failed_later_page_aborts_the_stream(monkeypatch):
+    with pytest.raises(RuntimeError, match="could not be saved"):
+        _export(monkeypatch, list(PAGES))
+
+def test_empty_export_is_not_an_error(monkeypatch):
+    res = _export(monkeypatch, [{"Success": False, "Message": "No destinations found"}])
+    assert res.status_code == 200 and res.text == ""
@@ -0,0 +1,171 @@
+# tests/test_resilience.py
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import backends
+from src.backends import AsyncBackend, AsyncResilientBackend, Backend, ResilientBackend
+from src.resilience import (BackendBusy, BackendTimeout, BackendUnavailable, CircuitBreaker, CircuitOpenError,
+                            ResiliencePolicy)
+
+ROWS = [{"destination_id": 1}]
+
+class ScriptedBackend(Backend):
+    """Each call takes the next outcome: an exception to raise or seconds to sleep before
+    answering. Once the script runs out, calls answer straight away."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _next(self):
+        with self._lock:
+            self.calls += 1
+            outcome = self.outcomes.pop(0) if self.outcomes else 0
+        if isinstance(outcome, Exception):
+            raise outcome
+        time.sleep(outcome)
+        return [{"destination_id": 1, "call": self.calls}] if outcome else ROWS
+
+    def select(self, table, filters=None, columns="*", order_by=None, limit=None, after=None):
+        return self._next()
+
+    def insert(self, table, row):
+        return self._next()
+
+class AsyncScriptedBackend(AsyncBackend):
+    def __init__(self, *delays):
+        self.delays = list(delays)
+        self.calls = 0
+
+    async def select(self, table, filters=None, columns="*", order_by=None, limit=None, after=None):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.delays.pop(0) if self.delays else 0)
+        return [{"destination_id": 1, "call": call}]
+
+def _policy(**options):
+    options.setdefault("backoff", 0)
+    options.setdefault("breaker", CircuitBreaker(failure_threshold=0))
+    return ResiliencePolicy(**options)
+
+# ---- circuit breaker ----
+
+def test_breaker_opens_goes_half_open_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.failure()
+    assert breaker.state == breaker.CLOSED
+    breaker.failure()
+    assert breaker.state == breaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    breaker.before_call()  # the single trial call
+    assert breaker.state == breaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # everyone else still fails fast
+    breaker.success()
+    assert breaker.state == breaker.CLOSED
+    breaker.before_call()
+
+def test_failed_trial_opens_the_circuit_again():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.failure()
+    assert breaker.state == breaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+def test_open_circuit_keeps_calls_off_the_backend():
+    inner = ScriptedBackend(*[ConnectionError("down")] * 10)
+    backend = ResilientBackend(inner, _policy(retries=0, breaker=CircuitBreaker(failure_threshold=3)))
+    for _ in range(3):
+        with pytest.raises(BackendUnavailable):
+            backend.select("destinations")
+    with pytest.raises(CircuitOpenError):
+        backend.select("destinations")
+    assert inner.calls == 3
+
+# ---- retries ----
+
+def test_reads_are_retried_on_transient_errors():
+    inner = ScriptedBackend(ConnectionError("reset"), sqlite3.OperationalError("database is locked"))
+    assert ResilientBackend(inner, _policy(retries=2)).select("destinations") == ROWS
+    assert inner.calls == 3
+
+def test_reads_give_up_after_their_retries():
+    inner = ScriptedBackend(*[ConnectionError("reset")] * 3)
+    with pytest.raises(BackendUnavailable):
+        ResilientBackend(inner, _policy(retries=2)).select("destinations")
+    assert inner.calls == 3
+
+def test_writes_are_not_retried():
+    inner = ScriptedBackend(ConnectionError("reset"))
+    with pytest.raises(BackendUnavailable):
+        ResilientBackend(inner, _policy(retries=2)).insert("destinations", {})
+    assert inner.calls == 1
+
+def test_non_transient_errors_pass_through_unchanged():
+    error = sqlite3.IntegrityError("UNIQUE constraint failed: users.user_email")
+    inner = ScriptedBackend(error)
+    breaker = CircuitBreaker(failure_threshold=1)
+    with pytest.raises(sqlite3.IntegrityError) as raised:
+        ResilientBackend(inner, _policy(retries=2, breaker=breaker)).select("users")
+    assert raised.value is error
+    assert inner.calls == 1
+    assert breaker.state == breaker.CLOSED
+
+# ---- timeouts and hedging ----
+
+def test_slow_calls_time_out():
+    inner = ScriptedBackend(0.5, 0.5)
+    with pytest.raises(BackendTimeout):
+        ResilientBackend(inner, _policy(read_timeout=0.05, retries=1)).select("destinations")
+    assert inner.calls == 2
+
+def test_hedge_wins_over_a_stalled_call():
+    inner = ScriptedBackend(1.0, 0.01)
+    backend = ResilientBackend(inner, _policy(hedge_after=0.05))
+    started = time.perf_counter()
+    rows = backend.select("destinations", {"user_id": "u"})
+    assert rows[0]["call"] == 2
+    assert time.perf_counter() - started < 0.5
+
+def test_async_hedge_wins_over_a_stalled_call():
+    inner = AsyncScriptedBackend(1.0, 0.01)
+    backend = AsyncResilientBackend(inner, _policy(hedge_after=0.05))
+
+    async def run():
+        started = time.perf_counter()
+        rows = await backend.select("destinations", {"user_id": "u"})
+        return rows, time.perf_counter() - started
+
+    rows, elapsed = asyncio.run(run())
+    assert rows[0]["call"] == 2 and elapsed < 0.5
+
+def test_waiting_for_a_backend_thread_is_not_a_backend_timeout(monkeypatch):
+    monkeypatch.setattr(backends, "_executor", ThreadPoolExecutor(max_workers=1))
+    breaker = CircuitBreaker(failure_threshold=1)
+    backend = ResilientBackend(ScriptedBackend(0.1, 0.1), _policy(read_timeout=0.15, retries=0, breaker=breaker))
+
+    # Queued behind another call for 0.1 s, then 0.1 s on the backend: within its own timeout
+    blocker = backends._executor.submit(time.sleep, 0.1)
+    assert backend.select("destinations")[0]["call"] == 1
+    blocker.result()
+
+    # No thread frees up in time: the call fails fast, but the circuit stays closed
+    release = threading.Event()
+    backends._executor.submit(release.wait)
+    with pytest.raises(BackendBusy):
+        backend.select("destinations")
+    release.set()
+    assert breaker.state == breaker.CLOSED
+    assert backend.select("destinations")[0]["call"] == 2
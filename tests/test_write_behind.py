@@ -0,0 +1,83 @@
+# tests/test_write_behind.py
+import sqlite3
+
+import pytest
+
+from src import db
+from src.backends import SQLiteBackend
+from src.resilience import BackendUnavailable
+from src.write_behind import PendingWrites
+
+class FlakyWrites(SQLiteBackend):
+    """Bulk writes fail with a transient error the next `failures` times."""
+
+    failures = 0
+
+    def _flake(self):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+
+    def insert_many(self, table, rows):
+        self._flake()
+        return super().insert_many(table, rows)
+
+    def update_many(self, table, key, rows):
+        self._flake()
+        return super().update_many(table, key, rows)
+
+@pytest.fixture
+def flaky(tmp_path):
+    backend = FlakyWrites(str(tmp_path / "travel_diary.db"))
+    db.set_backend(backend)
+    db.insert_user("ana@example.com", "ana", "secret")
+    db.insert_user("bob@example.com", "bob", "secret")
+    # A long window, so only the reads below flush the queue
+    db.configure_write_behind(60, max_attempts=2)
+    yield backend
+    db.configure_write_behind(0)
+    db.set_backend(SQLiteBackend(":memory:"))
+
+def _names():
+    res = db.get_destinations_by_user_name("ana")
+    return [row["destination_name"] for row in res["Data"]] if res["Success"] else res
+
+def test_failed_flush_is_requeued_and_read_sees_it_later(flaky):
+    assert db.insert_destination("ana", "Rome", "Italy")["Queued"]
+    flaky.failures = 1
+    with pytest.raises(BackendUnavailable):
+        db.get_destinations_by_user_name("ana")  # the read fails instead of leaving Rome out
+    assert db.write_queue.depth() == 1
+    assert _names() == ["Rome"]
+
+def test_requeued_batch_goes_ahead_of_newer_mutations():
+    older, newer = PendingWrites(), PendingWrites()
+    older.inserts = [{"destination_name": "Rome"}]
+    older.updates = {1: {"destination_id": 1, "notes": "old", "is_visited": True}, 2: {"destination_id": 2, "notes": "x"}}
+    older.deletes = {3: None}
+    newer.inserts = [{"destination_name": "Oslo"}]
+    newer.updates = {1: {"destination_id": 1, "notes": "new"}, 3: {"destination_id": 3, "notes": "too late"}}
+    newer.deletes = {2: None}
+    merged = older.merge(newer)
+    assert [row["destination_name"] for row in merged.inserts] == ["Rome", "Oslo"]
+    assert merged.updates == {1: {"destination_id": 1, "notes": "new", "is_visited": True}}
+    assert list(merged.deletes) == [3, 2]
+
+def test_given_up_writes_are_reported_to_their_users_next_read(flaky):
+    db.configure_write_behind(0)
+    oslo = db.insert_destination("ana", "Oslo", "Norway")["Data"]["destination_id"]
+    db.configure_write_behind(60, max_attempts=2)
+    db.insert_destination("ana", "Rome", "Italy")
+    db.update_destination_by_id(oslo, is_visited=True)
+    flaky.failures = 2
+    for _ in range(2):
+        with pytest.raises(BackendUnavailable):
+            db.write_queue.flush("retry")  # what the background thread does
+    assert db.write_queue.depth() == 0
+    # Another user's reads are not theirs to report
+    assert db.get_destinations_by_user_name("bob")["Message"] == "No destinations found"
+    assert db.get_destination_stats("bob")["Success"]
+    res = db.get_destinations_by_user_name("ana")
+    assert not res["Success"] and res["Message"] == "2 queued destination change(s) could not be saved"
+    # Reported once; later reads are back to normal
+    assert _names() == ["Oslo"]